@@ -1,7 +1,23 @@
 from .placement import solve
 from .placement import node_layer
+from .template_placement import solve_template
+from .parallel_placement import solve_parallel
+from .search_stats import SearchStats
+from .root_search import search_root
+from .placement_enum import iter_placements
+from .placement_repair import repair_placement
+from .placement_cache import PlacementCache
+from .placement_cache import placement_cache
 from .assign_router import assign_router
+from .assign_router import assign_router_arrays
+from .assign_router import write_core_ids
+from .assign_router import optimize_router_mapping
 from .routing_algorithms import xy_route_by_coord
 from .routing_algorithms import yx_route_by_coord
+from .routing_algorithms import route_batch
+from .routing_table import RoutingTable
+from .routing_table import compile_routing_table
+from .link_pipeline import run_pipeline
+from .link_pipeline import stream_links_to_network
 
-__all__ = ["solve", "node_layer", "assign_router", "xy_route_by_coord", "yx_route_by_coord"]
\ No newline at end of file
+__all__ = ["solve", "solve_template", "solve_parallel", "SearchStats", "search_root", "iter_placements", "repair_placement", "PlacementCache", "placement_cache", "node_layer", "assign_router", "assign_router_arrays", "write_core_ids", "optimize_router_mapping", "xy_route_by_coord", "yx_route_by_coord", "route_batch", "RoutingTable", "compile_routing_table", "run_pipeline", "stream_links_to_network"]
\ No newline at end of file
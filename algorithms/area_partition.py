@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from math import log2
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, Type
+
+import numpy as np
 
 from data_structure.grid import Grid
 
@@ -67,53 +69,114 @@ def split_block(b: Block, axis: str) -> Tuple[Block, Block]:
 
 
 def node_level(node_id: int) -> int:
-    return int(log2(node_id)) + 1
+    return int(node_id).bit_length()  # node_id 可能是 NumPy 整數（partition_arrays / TreeIndex 來的）
+
+
+def _start_axis(W: int, H: int) -> str:
+    return "x" if W > H else "y"  # 32: 先切x, 16: 先切y
+
+
+def _split_axis(start_axis: str, lvl: int) -> str:
+    """第 lvl 層的 block 往下切的方向：奇數層用 start_axis，偶數層換另一個"""
+    if lvl % 2 == 1:
+        return start_axis
+    return "y" if start_axis == "x" else "x"
+
+
+def partition_depth(num: int, leaf_area: int = 4) -> int:
+    """
+    partition 樹有幾層。同一層的 block 面積都一樣（num / 2^(lvl-1)），
+    面積 <= leaf_area 那一層就是最後一層。
+    """
+    grid_shape(num)  # 檢查 num
+    depth, area = 1, num
+    while area > leaf_area:
+        depth += 1
+        area //= 2
+    return depth
+
+
+def partition_arrays(
+    num: int,
+    leaf_area: int = 4,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    向量化版的 partition：回傳 (x0, x1, y0, y1) 四個陣列，用 heap id 當索引
+    （長度 2^depth，index 0 不用，填 -1）。一層一層整批切，不建 Block 物件。
+    """
+    W, H = grid_shape(num)
+    depth = partition_depth(num, leaf_area)
+    start_axis = _start_axis(W, H)
+
+    size = 1 << depth
+    x0 = np.full(size, -1, dtype=np.int64)
+    x1 = np.full(size, -1, dtype=np.int64)
+    y0 = np.full(size, -1, dtype=np.int64)
+    y1 = np.full(size, -1, dtype=np.int64)
+    x0[1], x1[1], y0[1], y1[1] = 0, W - 1, 0, H - 1
+
+    for lvl in range(1, depth):
+        p = np.arange(1 << (lvl - 1), 1 << lvl)
+        left, right = 2 * p, 2 * p + 1
+
+        if _split_axis(start_axis, lvl) == "x":
+            mid = (x0[p] + x1[p]) // 2
+            x0[left], x1[left] = x0[p], mid
+            x0[right], x1[right] = mid + 1, x1[p]
+            y0[left] = y0[right] = y0[p]
+            y1[left] = y1[right] = y1[p]
+        else:
+            mid = (y0[p] + y1[p]) // 2
+            y0[left], y1[left] = mid + 1, y1[p]     # 2i：上半部（y較大）
+            y0[right], y1[right] = y0[p], mid       # 2i+1：下半部
+            x0[left] = x0[right] = x0[p]
+            x1[left] = x1[right] = x1[p]
+
+    return x0, x1, y0, y1
 
 
 def build_area_partition(
     num: int,
     leaf_area: int = 4,
+    grid_cls: Type[Grid] = Grid,
 ) -> Tuple[Grid, Dict[int, Block]]:
     """
     回傳:
-      - grid: 依照 num 建好的 Grid
+      - grid: 依照 num 建好的 Grid（grid_cls 可換成 ArrayGrid 等其他 backend）
       - blocks: node_id -> Block(x0,x1,y0,y1)
 
     leaf_area=4 表示切到 2x2 就停止（符合你圖上的停止探索）
     """
     W, H = grid_shape(num)
-    grid = Grid(W, H)
-
-    start_axis = "x" if W > H else "y"  # 32: 先切x, 16: 先切y
-
-    blocks: Dict[int, Block] = {}
-    root = Block(0, W - 1, 0, H - 1)
-
-    q = [(1, root)]  # (node_id, block)
-
-    while q:
-        nid, b = q.pop(0)
-        blocks[nid] = b
+    grid = grid_cls(W, H)
+    return grid, build_blocks(num, leaf_area=leaf_area)
 
-        if b.area <= leaf_area:
-            continue
 
-        lvl = node_level(nid)
-        axis = start_axis if (lvl % 2 == 1) else ("y" if start_axis == "x" else "x")
-
-        c1, c2 = split_block(b, axis)
-        q.append((nid * 2, c1))
-        q.append((nid * 2 + 1, c2))
-
-    return grid, blocks
+def build_blocks(num: int, leaf_area: int = 4) -> Dict[int, Block]:
+    """只要 node_id -> Block，不建 Grid"""
+    x0, x1, y0, y1 = (a.tolist() for a in partition_arrays(num, leaf_area))
+    return {
+        nid: Block(x0[nid], x1[nid], y0[nid], y1[nid]) for nid in range(1, len(x0))
+    }
 
 
 def block_of_node(num: int, node_id: int, leaf_area: int = 4) -> Block:
-    """如果你只想查單一 node_id 的區塊"""
-    _, blocks = build_area_partition(num, leaf_area=leaf_area)
-    if node_id not in blocks:
+    """
+    直接查單一 node_id 的區塊，不建整個 partition：
+    從 root 開始照 node_id 的 bit（高位到低位）一路往下切，O(log n)。
+    """
+    depth = partition_depth(num, leaf_area)
+    if node_id < 1 or node_level(node_id) > depth:
         raise ValueError(f"node_id={node_id} 不存在（可能超過停止探索的深度）")
-    return blocks[node_id]
+
+    W, H = grid_shape(num)
+    start_axis = _start_axis(W, H)
+    b = Block(0, W - 1, 0, H - 1)
+    lvl = node_level(node_id)
+    for i in range(lvl - 2, -1, -1):
+        c1, c2 = split_block(b, _split_axis(start_axis, lvl - 1 - i))
+        b = c2 if (node_id >> i) & 1 else c1
+    return b
 
 
 if __name__ == "__main__":
@@ -1,54 +1,219 @@
 import math
+from typing import Dict, List, Tuple
 
-def router_in_tree(nums_of_cores):
+import numpy as np
+
+
+def router_in_tree(nums_of_cores, verbose: bool = True) -> List[List[int]]:
     """
     depth = 樹的深度（例如你畫的 3 層：1 → 2,3 → 4,5,6,7）
+    回傳每一層的 router 編號；verbose=True 時跟以前一樣印出來
     """
     depth = int(math.log2(nums_of_cores))
+    layers = []
     node = 1
     for level in range(1, depth + 1):
         count = 2 ** (level - 1)   # 該層節點數量
         layer_nodes = list(range(node, node + count))
-        
-        print(f"第 {level} 層：{layer_nodes}")
-        
+        layers.append(layer_nodes)
+
+        if verbose:
+            print(f"第 {level} 層：{layer_nodes}")
+
         node += count  # 移動到下一層的開始節點
+    return layers
 
 def core_address(core_id, num_cores):
     bits = int(math.log2(num_cores))
     return format(core_id, f"0{bits}b")
 
+def assign_router_arrays(num_cores: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    assign_router 的陣列版，回傳 (router_to_core, core_to_router)：
+      router_to_core[r] = core（index 0 不用，填 -1）
+      core_to_router[c] = router（沒有分到 router 的 core 填 -1）
+
+    core c 是在「c 和 c+1 第一次（從 MSB 掃下來）不同的 bit」被分到 router，
+    那個 bit 就是 b = ctz(c+1)（超過 bits-1 的話算 bits-1）。
+    router 先照 bit 由高到低、同一個 bit 再照 core 由小到大編號，
+    num_cores 是 2 的次方時可以直接寫成
+        router = 2^(bits-b-1) + ((c+1) >> (b+1))
+    最後一個 core（n-1）不會分到 router。
+    """
+    bits = int(math.log2(num_cores)) if num_cores > 0 else 0
+    router_to_core = np.full(num_cores, -1, dtype=np.int64)
+    core_to_router = np.full(num_cores, -1, dtype=np.int64)
+    if bits == 0:
+        return router_to_core, core_to_router
+
+    v = np.arange(1, num_cores, dtype=np.int64)   # c + 1
+    low = v & -v                                  # 最低的 1 bit
+    b = np.minimum(np.frexp(low.astype(np.float64))[1] - 1, bits - 1)
+
+    if num_cores == 1 << bits:
+        routers = (np.int64(1) << (bits - b - 1)) + (v >> (b + 1))
+        cores = v - 1
+    else:
+        # 不是 2 的次方就照 (bit 高 -> 低, core 小 -> 大) 排，最多 num_cores-1 個
+        cores = np.argsort(-b, kind="stable")[: num_cores - 1]
+        routers = np.arange(1, len(cores) + 1, dtype=np.int64)
+
+    router_to_core[routers] = cores
+    core_to_router[cores] = routers
+    return router_to_core, core_to_router
+
 def assign_router(num_cores):
     """
     依照位元翻轉規則分配 router：
     從最高位元 (MSB) 開始掃描，
     只要 core i 和 core i+1 在該 bit 不同，就在中間放一個 router，
     並把這個 router 分配給 core i。
+
+    回傳 {router 編號: core 編號}（照 router 編號排）；
+    要陣列的話用 assign_router_arrays。
     """
-    bits = int(math.log2(num_cores))
-    router_id = 1
-    router_map = {}  # key: router 編號 (int), value: core 編號 (int)
-    used_cores = set()   # 已經分配過 router 的 core
+    router_to_core, _ = assign_router_arrays(num_cores)
+    rids = np.flatnonzero(router_to_core >= 0)
+    return dict(zip(rids.tolist(), router_to_core[rids].tolist()))
 
+def write_core_ids(placed, router_to_core: np.ndarray) -> None:
+    """
+    把 router -> core 的配對寫回 placed：
+      - placement cache 的陣列（有 router_id / core_id 欄位）：一次 array 運算
+      - Dict[int, Node]：每個 Node 依自己的 router_id 查表
+    沒有對到 core 的 router 維持原本的 core_id。
+    """
+    if isinstance(placed, np.ndarray):
+        rid = placed["router_id"]
+        ok = (rid > 0) & (rid < len(router_to_core))
+        cores = np.where(ok, router_to_core[np.where(ok, rid, 0)], -1)
+        placed["core_id"] = np.where(cores >= 0, cores, placed["core_id"])
+        return
+
+    table = router_to_core.tolist()
+    for n in placed.values():
+        rid = n.router_id
+        if rid is not None and 0 < rid < len(table) and table[rid] >= 0:
+            n.core_id = table[rid]
+
+def _router_positions(placed, num_cores: int) -> Tuple[np.ndarray, np.ndarray]:
+    """router_id -> (x, y) 陣列（index 0 不用）"""
+    rx = np.full(num_cores, -1, dtype=np.int64)
+    ry = np.full(num_cores, -1, dtype=np.int64)
+    for n in placed.values():
+        if n.router_id is not None and 0 < n.router_id < num_cores:
+            rx[n.router_id], ry[n.router_id] = n.x, n.y
+    if (rx[1:] < 0).any():
+        raise ValueError("placed 少了某些 router_id")
+    return rx, ry
+
+def _core_targets(placed, num_cores: int, target) -> Tuple[np.ndarray, np.ndarray]:
+    """每個 core 流量的目的地；None = root（router 1）的位置，也可以給一個 (x, y) 或 (num_cores, 2) 陣列"""
+    if target is None:
+        root = next(n for n in placed.values() if n.router_id == 1)
+        target = (root.x, root.y)
+    t = np.asarray(target, dtype=np.int64)
+    if t.shape == (2,):
+        t = np.broadcast_to(t, (num_cores, 2))
+    if t.shape != (num_cores, 2):
+        raise ValueError("target 必須是 (x, y) 或 shape (num_cores, 2)")
+    return t[:, 0], t[:, 1]
+
+def mapping_cost(placed, router_to_core: np.ndarray, weights=None, target=None) -> float:
+    """sum(w_c * 從 core c 的 router 到 target 的 hop 數)；沒有 router 的 core 不算"""
+    num_cores = len(router_to_core)
+    w = np.ones(num_cores) if weights is None else np.asarray(weights, dtype=np.float64)
+    rx, ry = _router_positions(placed, num_cores)
+    tx, ty = _core_targets(placed, num_cores, target)
+    r = np.flatnonzero(router_to_core >= 0)
+    c = router_to_core[r]
+    return float((w[c] * (np.abs(rx[r] - tx[c]) + np.abs(ry[r] - ty[c]))).sum())
 
-    # 從 MSB 到 LSB
-    for bit_idx in range(bits - 1, -1, -1):
-        # 掃所有 core 對 (core, core+1)
-        for core in range(num_cores - 1):
-            b_cur = (core >> bit_idx) & 1
-            b_nxt = ((core + 1) >> bit_idx) & 1
+def optimize_router_mapping(placed, weights=None, target=None, leftover: int = -1):
+    """
+    看 placement 決定 router <-> core 配對，讓 sum(w_c * hop(router(c), target_c)) 最小。
+
+    樹的限制跟 assign_router 一樣：第 L 層第 k 個 router 管 core 位址
+    [k*s, (k+1)*s)（s = n / 2^(L-1)），它只能配這個範圍裡的 core，
+    每棵子樹的 s-1 個 router 用掉範圍裡 s-1 個 core，剩一個往上交給祖先。
+    所以 f(r, u) = 「子樹 r 剩下 core u 時的最小成本」可以一層一層往上算：
+        u 在左半：f(r, u) = f(左, u) + min_v∈右半 [f(右, v) + cost(r, v)]
+    每層整批用 NumPy 算，全部 O(n log n)；這是這個限制下的精確最佳解。
+
+    weights : 每個 core 的流量權重（預設都是 1）
+    target  : 流量的目的地，None = root 的位置；也可以每個 core 各給一個
+    leftover: 不分 router 的 core，預設 -1 = 最後一個 core（跟 assign_router 一樣）；
+              None 表示也交給最佳化決定
+
+    回傳 (router_to_core, core_to_router, report)，report 有 default / optimized 的成本、
+    改善比例與平均 hop 數。
+    """
+    num_cores = len(placed) + 1
+    bits = int(math.log2(num_cores))
+    if num_cores != 1 << bits:
+        raise ValueError("num_cores 必須是 2 的次方")
+    w = np.ones(num_cores) if weights is None else np.asarray(weights, dtype=np.float64)
+    if w.shape != (num_cores,):
+        raise ValueError("weights 長度必須是 num_cores")
+    rx, ry = _router_positions(placed, num_cores)
+    tx, ty = _core_targets(placed, num_cores, target)
 
-            # 這個 bit 有 0/1 翻轉，而且這個 core 還沒被用過
-            if b_cur != b_nxt and core not in used_cores:
-                router_map[router_id] = core
-                used_cores.add(core)
-                router_id += 1
+    # F[u] = 目前這層、u 所在的子樹剩下 u 時的最小成本（最底下每個 core 自己一棵，成本 0）
+    F = np.zeros(num_cores)
+    picks = {}
+    for lvl in range(bits, 0, -1):
+        m = 1 << (lvl - 1)
+        s = num_cores // m
+        h = s // 2
+        routers = np.arange(m, 2 * m)
+        cost = w.reshape(m, s) * (
+            np.abs(rx[routers][:, None] - tx.reshape(m, s))
+            + np.abs(ry[routers][:, None] - ty.reshape(m, s))
+        )
+        total = (F.reshape(m, s) + cost).reshape(m, 2, h)
+        idx = total.argmin(axis=2)                      # (m, 2)：每一半最好的 v
+        best = np.take_along_axis(total, idx[:, :, None], axis=2)[:, :, 0]
+        Fm = F.reshape(m, 2, h).copy()
+        Fm[:, 0, :] += best[:, 1][:, None]
+        Fm[:, 1, :] += best[:, 0][:, None]
+        F = Fm.reshape(num_cores)
+        picks[lvl] = idx
 
-                # 16 cores → 只需要 15 個 router
-                if router_id > num_cores - 1:
-                    return router_map
+    if leftover is None:
+        leftover = int(F.argmin())
+    leftover %= num_cores
 
-                
+    # 由上往下還原：每個 router 拿另一半裡最好的那個，剩下的往下傳
+    router_to_core = np.full(num_cores, -1, dtype=np.int64)
+    left_over = np.array([leftover], dtype=np.int64)
+    for lvl in range(1, bits + 1):
+        m = 1 << (lvl - 1)
+        s = num_cores // m
+        h = s // 2
+        i = np.arange(m)
+        half = (left_over - i * s) // h
+        other = 1 - half
+        v = i * s + other * h + picks[lvl][i, other]
+        router_to_core[m + i] = v
+        nxt = np.empty(2 * m, dtype=np.int64)
+        nxt[2 * i + half] = left_over
+        nxt[2 * i + other] = v
+        left_over = nxt
 
-    return router_map
+    core_to_router = np.full(num_cores, -1, dtype=np.int64)
+    rids = np.arange(1, num_cores)
+    core_to_router[router_to_core[1:]] = rids
 
+    default_r2c, _ = assign_router_arrays(num_cores)
+    default_cost = mapping_cost(placed, default_r2c, w, target)
+    optimized_cost = mapping_cost(placed, router_to_core, w, target)
+    assigned_w = float(w[router_to_core[1:]].sum())
+    default_w = float(w[default_r2c[1:]].sum())
+    report = {
+        "default_cost": default_cost,
+        "optimized_cost": optimized_cost,
+        "improvement": (default_cost - optimized_cost) / default_cost if default_cost else 0.0,
+        "avg_hops_default": default_cost / default_w if default_w else 0.0,
+        "avg_hops_optimized": optimized_cost / assigned_w if assigned_w else 0.0,
+    }
+    return router_to_core, core_to_router, report
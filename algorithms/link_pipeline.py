@@ -0,0 +1,171 @@
+"""
+placement -> (parent, child) -> Route -> 邊 -> 去重 -> Network 的串流版本。
+
+每一段都是 generator，吃上一段的 iterable、吐下一段要的東西，
+中間不會建 routes[level][(p, c)] 那種整包的 dict：
+    pairs  = iter_pairs(num_nodes, levels=[2])
+    routes = route_pairs(pairs, placed, index, order="XY")
+    links  = dedup_links(route_links(unique_routes(routes)), policy="undirected")
+    link_sink(links, network, index, bandwidth=2)
+run_pipeline(source, stage, stage, ...) 就是把上面串起來；
+換 YX、換去重方式、多加一段 filter 都只是換掉其中一段。
+"""
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from algorithms.topology_cache import topology_cache
+from data_structure import Network, Node, Route, RouterIndex
+
+Pair = Tuple[int, int, int]  # (level, parent, child)
+Edge = Tuple[int, int]  # (u_router, v_router)
+Stage = Callable[[Iterable], Iterable]
+
+DEDUP_POLICIES = ("undirected", "directed", "none")
+
+# 從 TreeIndex 的陣列一次轉多少個配對成 Python int
+_PAIR_CHUNK = 4096
+
+
+def iter_pairs(num_nodes: int, levels: Optional[Iterable[int]] = None) -> Iterator[Pair]:
+    """(level, parent, child)，level 由小到大；levels 有給就只產生那幾層"""
+    tree = topology_cache.tree_index(num_nodes)
+    if levels is None:
+        levels = tree.pairs_by_level().keys()
+    for level in sorted(levels):
+        parents, children = tree.pairs(level)
+        for lo in range(0, len(parents), _PAIR_CHUNK):
+            ps = parents[lo:lo + _PAIR_CHUNK].tolist()
+            cs = children[lo:lo + _PAIR_CHUNK].tolist()
+            for p, c in zip(ps, cs):
+                yield level, p, c
+
+
+def route_pairs(
+    pairs: Iterable[Pair],
+    placed: Dict[int, Node],
+    index: RouterIndex,
+    order: str = "XY",
+) -> Iterator[Route]:
+    """每個配對一個 Route（只存端點，hop 用到才展開），跟 interconnect.build_route_entry 一樣"""
+    for _, p, c in pairs:
+        p_node = placed[p]
+        c_node = placed[c]
+        yield Route(
+            parent=p,
+            child=c,
+            src_router=p_node.router_id,
+            dst_router=c_node.router_id,
+            src=(p_node.x, p_node.y),
+            dst=(c_node.x, c_node.y),
+            order=order,
+            lookup=index,
+        )
+
+
+def unique_routes(routes: Iterable[Route]) -> Iterator[Route]:
+    """只留 XY == YX 的（起終點同一列 / 同一行），跟 add_unique_route_links_for_level 一樣"""
+    for r in routes:
+        if r.is_unique and r.length >= 2:
+            yield r
+
+
+def route_links(routes: Iterable[Route], order: Optional[str] = None) -> Iterator[Edge]:
+    """Route 拆成相鄰 router 的邊；order 沒給就用 Route 自己的"""
+    for r in routes:
+        yield from r.links(order)
+
+
+def dedup_links(
+    links: Iterable[Edge],
+    policy: str = "undirected",
+    seen: Optional[Set[Edge]] = None,
+) -> Iterator[Edge]:
+    """
+    去掉重複的邊：
+      "undirected" : (u, v) 跟 (v, u) 算同一條（seen 存 (min, max)）
+      "directed"   : 方向不同就算不同條
+      "none"       : 不去重
+    seen 可以從外面傳進來跨好幾次 pipeline 共用（例如一層一層加）。
+    要記的只有「已經加過的邊」，最多就是 mesh 上的邊數，不會跟著路徑數長。
+    """
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"policy 必須是 {DEDUP_POLICIES} 其中之一")
+    if policy == "none":
+        yield from links
+        return
+    if seen is None:
+        seen = set()
+    undirected = policy == "undirected"
+    for u, v in links:
+        key = (u, v) if not undirected or u < v else (v, u)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield u, v
+
+
+def link_sink(
+    links: Iterable[Edge],
+    network: Network,
+    index: RouterIndex,
+    bandwidth: float = 1.0,
+    color: str = "black",
+    added: Optional[List[Edge]] = None,
+) -> int:
+    """
+    最後一段：把邊加進 network，回傳加了幾條。
+    找不到 Node 的 router 直接跳過；added 有給的話順便記下加了哪些邊。
+    network 自己有設 dedup 的話，被它擋掉的邊不算。
+    """
+    count = 0
+    for u, v in links:
+        node_u = network.node(u) or index.node_of(u)
+        node_v = network.node(v) or index.node_of(v)
+        if node_u is None or node_v is None:
+            continue
+        if network.add_link(node_u, node_v, bandwidth, color=color) is None:
+            continue
+        if added is not None:
+            added.append((u, v))
+        count += 1
+    return count
+
+
+def run_pipeline(source: Iterable, *stages: Stage):
+    """source 依序丟給每一段 stage；最後一段是 sink 的話回傳的就是 sink 的結果"""
+    out = source
+    for stage in stages:
+        out = stage(out)
+    return out
+
+
+def stream_links_to_network(
+    network: Network,
+    placed: Dict[int, Node],
+    num_nodes: int,
+    index: Optional[RouterIndex] = None,
+    levels: Optional[Iterable[int]] = None,
+    order: str = "XY",
+    route_filter: Optional[Stage] = unique_routes,
+    dedup: str = "undirected",
+    seen: Optional[Set[Edge]] = None,
+    bandwidth: float = 1.0,
+    color: str = "black",
+    added: Optional[List[Edge]] = None,
+) -> int:
+    """
+    常用的整條 pipeline：配對 -> Route -> (route_filter) -> 邊 -> 去重 -> network。
+    預設等於對每一層跑 add_unique_route_links_for_level；
+    route_filter=None 就是每條路徑都加（像 add_last_level_routes_to_network）。
+    """
+    if index is None:
+        index = RouterIndex.from_placed(placed)
+    stages: List[Stage] = [partial(route_pairs, placed=placed, index=index, order=order)]
+    if route_filter is not None:
+        stages.append(route_filter)
+    stages += [
+        route_links,
+        partial(dedup_links, policy=dedup, seen=seen),
+        partial(link_sink, network=network, index=index, bandwidth=bandwidth, color=color, added=added),
+    ]
+    return run_pipeline(iter_pairs(num_nodes, levels), *stages)
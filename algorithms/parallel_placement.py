@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple, Type
+
+from algorithms.placement import (
+    block_order,
+    candidates_for_node,
+    capacity_ok,
+    dfs_blocks,
+    dfs_leaves,
+    leaf_parents_of,
+    mark,
+    node_layer,
+    parent_id,
+    place_node_at,
+    place_node_unchecked,
+    prepare_search,
+    rollback,
+)
+from data_structure import Grid
+
+XY = Tuple[int, int]
+
+# worker 端的中止旗標（pool initializer 設定）
+_stop_event = None
+
+
+def _init_worker(event):
+    global _stop_event
+    _stop_event = event
+
+
+def _stopped() -> bool:
+    return _stop_event is not None and _stop_event.is_set()
+
+
+def enumerate_prefixes(num: int, split_depth: int = 2, prune: bool = False) -> List[Tuple[XY, ...]]:
+    """
+    把 Part A 的前 split_depth 個 block 節點（block_order 的順序）所有合法放法列出來，
+    順序跟 serial 的 dfs_blocks 嘗試的順序一樣；每個 prefix 是一個獨立的子搜尋。
+    """
+    grid, blocks, dists, placed = prepare_search(num, Grid, prune)
+    order = block_order(blocks)
+    k = min(split_depth, len(order))
+    out: List[Tuple[XY, ...]] = []
+
+    def rec(idx: int, prefix: List[XY]):
+        if idx == k:
+            out.append(tuple(prefix))
+            return
+        nid = order[idx]
+        pxy = (placed[parent_id(nid)].x, placed[parent_id(nid)].y)
+        for xy in candidates_for_node(grid, blocks, nid, pxy, dists[node_layer(nid) - 2]):
+            cp = mark(grid, placed)
+            place_node_unchecked(grid, placed, nid, xy)
+            if not prune or capacity_ok(grid, blocks, nid, xy, num - 1):
+                rec(idx + 1, prefix + [xy])
+            rollback(grid, placed, cp)
+
+    rec(0, [])
+    return out
+
+
+def _solve_prefix(
+    num: int,
+    grid_cls: Type[Grid],
+    prune: bool,
+    prefix: Tuple[XY, ...],
+    index: int,
+) -> Tuple[int, bool, bool, Optional[Dict[int, XY]]]:
+    """
+    worker：套用 prefix 之後把剩下的 Part A 和 Part B 做完。
+    回傳 (index, Part A 成功, Part B 成功, node_id -> (x, y))
+    """
+    grid, blocks, dists, placed = prepare_search(num, grid_cls, prune)
+    order = block_order(blocks)
+    for nid, xy in zip(order, prefix):
+        place_node_unchecked(grid, placed, nid, xy)
+
+    if not dfs_blocks(grid, blocks, dists, placed, order, len(prefix), num - 1, prune, stop=_stopped):
+        return index, False, False, None
+    if not dfs_leaves(grid, blocks, dists, placed, leaf_parents_of(blocks), 0, stop=_stopped):
+        return index, True, False, None
+    return index, True, True, {nid: (n.x, n.y) for nid, n in placed.items()}
+
+
+def _build_result(num: int, grid_cls: Type[Grid], positions: Dict[int, XY]):
+    grid, _, _, placed = prepare_search(num, grid_cls)
+    for nid in sorted(positions):
+        if nid != 1:
+            placed[nid] = place_node_at(grid, nid, router_id=nid, core_id=-1, xy=positions[nid])
+    grid.commit()
+    placed.commit()
+    return placed, grid
+
+
+def solve_parallel(
+    num: int,
+    workers: Optional[int] = None,
+    split_depth: int = 2,
+    deterministic: bool = True,
+    grid_cls: Type[Grid] = Grid,
+    prune: bool = False,
+):
+    """
+    把 Part A 最上面 split_depth 個節點的放法拆成多個子搜尋，丟給 process pool 平行跑。
+    回傳格式跟 solve 一樣：(placed, grid)。
+
+    workers      : process 數（預設 os.cpu_count()；1 就在本 process 依序跑）
+    deterministic: True  = 照 prefix 順序取第一個 Part A 成功的，結果跟 solve 完全一樣
+                   False = 誰先整棵放完就用誰（比較快，但每次結果可能不同）
+    找到答案之後其他 worker 會被要求中止。
+    """
+    prefixes = enumerate_prefixes(num, split_depth, prune)
+    if not prefixes:
+        raise RuntimeError("blocks 節點放置失敗（1..7）")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(prefixes)))
+
+    if workers == 1:
+        any_part_a = False
+        for i, prefix in enumerate(prefixes):
+            _, part_a, part_b, positions = _solve_prefix(num, grid_cls, prune, prefix, i)
+            any_part_a = any_part_a or part_a
+            if part_b:
+                return _build_result(num, grid_cls, positions)
+            if part_a and deterministic:
+                break
+        _raise_failure(any_part_a)
+
+    ctx = multiprocessing.get_context()
+    event = ctx.Event()
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(event,)
+    )
+    futures = []
+    try:
+        futures = [
+            pool.submit(_solve_prefix, num, grid_cls, prune, prefix, i)
+            for i, prefix in enumerate(prefixes)
+        ]
+        result = None
+        any_part_a = False
+        if deterministic:
+            # 照 prefix 順序等：第一個 Part A 成功的就是 serial 會走到的那一支
+            for fut in futures:
+                _, part_a, part_b, positions = fut.result()
+                if part_a:
+                    any_part_a = True
+                    result = positions if part_b else None
+                    break
+        else:
+            pending = set(futures)
+            while pending and result is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    _, part_a, part_b, positions = fut.result()
+                    any_part_a = any_part_a or part_a
+                    if part_b:
+                        result = positions
+                        break
+    finally:
+        event.set()
+        for fut in futures:
+            fut.cancel()
+        pool.shutdown(wait=True)
+
+    if result is None:
+        _raise_failure(any_part_a)
+    return _build_result(num, grid_cls, result)
+
+
+def _raise_failure(part_a_ok: bool):
+    if part_a_ok:
+        raise RuntimeError("leaf 放置失敗（在 2×2 block 內找 dist[-1] 位置）")
+    raise RuntimeError("blocks 節點放置失敗（1..7）")
@@ -1,14 +1,21 @@
 # main.py
 from __future__ import annotations
 
-import math
-from typing import Dict, List, Tuple, Optional
-
-from algorithms.area_partition import build_area_partition, Block
-from algorithms.level_dist import inter_layer_distances
-from data_structure import Node
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Type
+
+from algorithms.area_partition import Block
+from algorithms.search_stats import SearchStats
+from algorithms.topology_cache import topology_cache
+from data_structure import Node, Grid, BitsetGrid, PlacedMap
 from visualize import visualize_grid
 
+# placement 演算法（候選順序、root 位置 ...）改了、結果會不一樣時要 +1；
+# 磁碟上的 placement cache 靠它判斷舊檔還能不能用
+SOLVER_VERSION = 1
+
 
 # -----------------------------
 # 基本工具
@@ -16,7 +23,7 @@ from visualize import visualize_grid
 def node_layer(node_id: int) -> int:
     if node_id < 1:
         raise ValueError("node_id must be >= 1")
-    return int(math.floor(math.log2(node_id))) + 1
+    return int(node_id).bit_length()  # TreeIndex.pairs() 給的是 np.int64
 
 
 def parent_id(node_id: int) -> int:
@@ -46,6 +53,99 @@ def remove_node_at(grid, xy: Tuple[int, int]) -> None:
     grid.remove(x, y)
 
 
+def place_node_unchecked(grid, placed: PlacedMap, node_id: int, xy: Tuple[int, int]) -> None:
+    """DFS 熱路徑用：xy 來自候選清單，一定在範圍內而且是空的，不再重複檢查"""
+    x, y = xy
+    grid.place_unchecked(x, y, node_id)
+    placed.assign(node_id, Node(x=x, y=y, router_id=node_id, core_id=-1))
+
+
+def subtree_size(node_id: int, num_nodes: int) -> int:
+    """heap 編號 node_id 底下（含自己）有幾個 id <= num_nodes 的節點"""
+    size = 0
+    lo = hi = node_id
+    while lo <= num_nodes:
+        size += min(hi, num_nodes) - lo + 1
+        lo, hi = lo * 2, hi * 2 + 1
+    return size
+
+
+def capacity_ok(
+    grid,
+    blocks: Dict[int, Block],
+    node_id: int,
+    xy: Tuple[int, int],
+    num_nodes: int,
+) -> bool:
+    """
+    node_id 剛放到 xy 之後的可行性檢查：
+    xy 會落在一串子孫的 block 裡（子、孫...），這些子孫都還沒放，
+    它們的 block 剩下的空格必須 >= 整棵子樹的節點數，否則這條路一定走不通。
+    其他 block 的空格數跟需求都沒變，不用檢查。
+    """
+    x, y = xy
+    nid = node_id
+    while True:
+        nxt = None
+        for child in (nid * 2, nid * 2 + 1):
+            b = blocks.get(child)
+            if b is not None and in_block(b, x, y):
+                nxt = child
+                break
+        if nxt is None:
+            return True
+        b = blocks[nxt]
+        if grid.free_count(b.x0, b.x1, b.y0, b.y1) < subtree_size(nxt, num_nodes):
+            return False
+        nid = nxt
+
+
+def mark(grid, placed: PlacedMap) -> Tuple[int, int]:
+    return grid.mark(), placed.mark()
+
+
+def rollback(grid, placed: PlacedMap, checkpoint: Tuple[int, int]) -> None:
+    grid.rollback(checkpoint[0])
+    placed.rollback(checkpoint[1])
+
+
+@lru_cache(maxsize=None)
+def ring_offsets(d: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    曼哈頓距離剛好 = d 的所有位移 (dx, dy)，每個距離只算一次。
+    依 (dx, dy) 排序，加到 parent 上剛好就是逐格掃描的順序（先 x 再 y）。
+    """
+    offs = []
+    for dx in range(-d, d + 1):
+        r = d - abs(dx)
+        offs.extend((dx, dy) for dy in ((-r, r) if r else (0,)))
+    return tuple(offs)
+
+
+def ring_cells(
+    x0: int,
+    x1: int,
+    y0: int,
+    y1: int,
+    parent_xy: Tuple[int, int],
+    d: int,
+) -> Iterator[Tuple[int, int]]:
+    """
+    矩形 x0..x1, y0..y1 內跟 parent 距離 = d 的格子。
+    用 ring_offsets 表，先用 bisect 跳到 x >= x0 的位移，x > x1 就停，成本是 O(d) 而不是區塊面積。
+    """
+    px, py = parent_xy
+    offs = ring_offsets(d)
+    for i in range(bisect_left(offs, (x0 - px, -d - 1)), len(offs)):
+        dx, dy = offs[i]
+        x = px + dx
+        if x > x1:
+            break
+        y = py + dy
+        if y0 <= y <= y1:
+            yield x, y
+
+
 def candidates_for_node(
     grid,
     blocks: Dict[int, Block],
@@ -54,22 +154,172 @@ def candidates_for_node(
     target_dist: int,
 ) -> List[Tuple[int, int]]:
     b = blocks[node_id]
-    cands: List[Tuple[int, int]] = []
-    for x in range(b.x0, b.x1 + 1):
-        for y in range(b.y0, b.y1 + 1):
-            if grid.is_used(x, y):
-                continue
-            if parent_child_dist(parent_xy, (x, y)) == target_dist:
-                cands.append((x, y))
-    return cands
-
-
-def solve(num: int):
-    grid, blocks = build_area_partition(num, leaf_area=4)  # 2x2 停止 :contentReference[oaicite:2]{index=2}
-    n_layers, dists = inter_layer_distances(num)           # 16 -> [2,2,1] :contentReference[oaicite:3]{index=3}
-    d_last = dists[-1]
+    if isinstance(grid, BitsetGrid):
+        # ring & block & ~occupied，一次算完
+        return grid.candidates(b.x0, b.x1, b.y0, b.y1, parent_xy, target_dist)
 
-    placed: Dict[int, Node] = {}
+    # 只看 ring 上落在 block 內的格子（都在 grid 範圍內，不用再檢查邊界）
+    return [
+        (x, y)
+        for x, y in ring_cells(b.x0, b.x1, b.y0, b.y1, parent_xy, target_dist)
+        if not grid.is_used_unchecked(x, y)
+    ]
+
+
+def dfs_mcv(
+    grid,
+    blocks: Dict[int, Block],
+    dists,
+    placed: PlacedMap,
+    num_nodes: int,
+    prune: bool = False,
+    stats: Optional[SearchStats] = None,
+) -> bool:
+    """
+    Most-constrained-first 的 DFS（root 已經放好）：
+      - 變數順序：parent 已放好的節點裡，候選格最少的先放（同數量取 id 小的）
+      - 值順序  ：能讓自己的子節點留下最多候選格的位置先試
+      - forward checking：放完之後，候選集合有被影響的待放節點只要有人不夠放就立刻回朔
+        （同一個 2×2 block 裡兩個 leaf 都還沒放時，至少要 2 格）
+    block 節點跟 leaf 一起搜，不再分 Part A / Part B。
+    遞迴改成顯式 stack，大尺寸不會撞到 recursion limit。
+    """
+
+    def dom(nid: int) -> int:
+        # leaf 沒有自己的 block，放在 parent 的 block 裡
+        return nid if nid in blocks else nid // 2
+
+    def kids(nid: int) -> List[int]:
+        return [c for c in (nid * 2, nid * 2 + 1) if c <= num_nodes]
+
+    def dist_of(nid: int) -> int:
+        return dists[node_layer(nid) - 2]
+
+    def block_chain(xy: Tuple[int, int]) -> List[int]:
+        """所有包含 xy 的 block（root 一路往下）"""
+        x, y = xy
+        chain = []
+        nid = 1
+        while nid is not None:
+            chain.append(nid)
+            nid = next(
+                (c for c in (nid * 2, nid * 2 + 1) if c in blocks and in_block(blocks[c], x, y)),
+                None,
+            )
+        return chain
+
+    # domain block id -> 待放節點（parent 已放好）
+    frontier: Dict[int, set] = {}
+    cache: Dict[int, List[Tuple[int, int]]] = {}
+
+    def add_frontier(nid: int):
+        frontier.setdefault(dom(nid), set()).add(nid)
+
+    def remove_frontier(nid: int):
+        frontier[dom(nid)].discard(nid)
+        cache.pop(nid, None)
+
+    def cands(nid: int) -> List[Tuple[int, int]]:
+        if nid not in cache:
+            p = placed[nid // 2]
+            cache[nid] = candidates_for_node(grid, blocks, dom(nid), (p.x, p.y), dist_of(nid))
+        return cache[nid]
+
+    def need(nid: int) -> int:
+        if nid not in blocks and (nid ^ 1) in frontier.get(dom(nid), ()):
+            return 2
+        return 1
+
+    def affected(xy: Tuple[int, int]) -> List[int]:
+        """候選集合可能因為 xy 改變的待放節點；順便把它們的快取丟掉"""
+        out = []
+        for d in block_chain(xy):
+            for nid in frontier.get(d, ()):
+                cache.pop(nid, None)
+                out.append(nid)
+        return out
+
+    def score(nid: int, xy: Tuple[int, int]) -> int:
+        return sum(
+            len(candidates_for_node(grid, blocks, dom(c), xy, dist_of(c)))
+            for c in kids(nid)
+        )
+
+    def select():
+        pending = [nid for group in frontier.values() for nid in group]
+        if not pending:
+            return None
+        nid = min(pending, key=lambda u: (len(cands(u)), u))
+        ordered = sorted(cands(nid), key=lambda xy: -score(nid, xy))
+        if stats is not None:
+            stats.on_candidates(nid, len(ordered))
+        return [nid, ordered, 0, None]  # [節點, 候選, 下一個要試的 index, 目前這次嘗試的 checkpoint]
+
+    def undo(nid: int, xy: Tuple[int, int], cp):
+        rollback(grid, placed, cp)
+        for c in kids(nid):
+            remove_frontier(c)
+        add_frontier(nid)
+        affected(xy)
+
+    for c in kids(1):
+        add_frontier(c)
+    if any(len(cands(c)) < need(c) for c in kids(1)):
+        return False
+
+    frame = select()
+    if frame is None:
+        return True
+    stack = [frame]
+    while stack:
+        frame = stack[-1]
+        nid, ordered, i, cp = frame
+        if cp is not None:
+            undo(nid, ordered[i - 1], cp)
+            frame[3] = None
+            if stats is not None:
+                stats.on_backtrack(nid)
+        if i == len(ordered):
+            if stats is not None:
+                stats.on_dead_end(nid, len(placed))
+            stack.pop()
+            continue
+
+        xy = ordered[i]
+        frame[2] = i + 1
+        if stats is not None:
+            stats.on_expand(nid)
+        frame[3] = mark(grid, placed)
+        place_node_unchecked(grid, placed, nid, xy)
+        remove_frontier(nid)
+        for c in kids(nid):
+            add_frontier(c)
+
+        if prune and not capacity_ok(grid, blocks, nid, xy, num_nodes):
+            affected(xy)
+            continue
+        touched = set(affected(xy)) | set(kids(nid))
+        if any(len(cands(u)) < need(u) for u in touched):
+            continue
+
+        nxt = select()
+        if nxt is None:
+            return True
+        stack.append(nxt)
+    return False
+
+
+def prepare_search(num: int, grid_cls: Type[Grid] = Grid, prune: bool = False):
+    """
+    建 grid、從共用快取拿 partition / 距離表，並放好固定的 root。
+    回傳 (grid, blocks, dists, placed)。
+    """
+    # partition / 距離表從共用快取拿（唯讀），grid 每次都建新的
+    blocks = topology_cache.area_partition(num, leaf_area=4)  # 2x2 停止 :contentReference[oaicite:2]{index=2}
+    grid = grid_cls(*topology_cache.grid_shape(num))
+    n_layers, dists = topology_cache.inter_layer_distances(num)  # 16 -> [2,2,1] :contentReference[oaicite:3]{index=3}
+
+    placed = PlacedMap()
 
     # 固定 root（你原本固定方式）
     root_block = blocks[1]
@@ -79,93 +329,214 @@ def solve(num: int):
     if not in_block(root_block, fixed_x, top_y):
         raise RuntimeError("node1 固定點不在 block1 內")
     placed[1] = place_node_at(grid, 1, router_id=1, core_id=-1, xy=root_xy)
+    if prune and not capacity_ok(grid, blocks, 1, root_xy, num - 1):
+        raise RuntimeError("node1 固定點讓某個 block 的空格不夠放")
+    return grid, blocks, dists, placed
 
-    # -------------------------
-    # Part A: 放 blocks 節點 (1..7)
-    # -------------------------
-    block_node_ids = sorted(blocks.keys())
-    orderA = [nid for nid in block_node_ids if nid != 1]
 
-    def dfs_blocks(idx: int) -> bool:
-        if idx == len(orderA):
-            return True
-
-        nid = orderA[idx]
-        pid = parent_id(nid)
-        if pid not in placed:
-            return False
-        parent_xy = (placed[pid].x, placed[pid].y)
+# -------------------------
+# Part A: 放 blocks 節點 (1..7)
+# -------------------------
+def block_order(blocks: Dict[int, Block]) -> List[int]:
+    """Part A 的放置順序：root 以外的 block 節點，照 heap id"""
+    return [nid for nid in sorted(blocks.keys()) if nid != 1]
 
-        lyr = node_layer(nid)
-        target_dist = dists[lyr - 2]  # layer2 用 dists[0] ... :contentReference[oaicite:4]{index=4}
 
-        cands = candidates_for_node(grid, blocks, nid, parent_xy, target_dist)
-        for xy in cands:
-            placed[nid] = place_node_at(grid, nid, router_id=nid, core_id=-1, xy=xy)
-            if dfs_blocks(idx + 1):
-                return True
-            remove_node_at(grid, xy)
-            del placed[nid]
+def dfs_blocks(
+    grid,
+    blocks: Dict[int, Block],
+    dists,
+    placed: PlacedMap,
+    order: List[int],
+    idx: int,
+    num_nodes: int,
+    prune: bool = False,
+    stop: Optional[Callable[[], bool]] = None,
+    stats: Optional[SearchStats] = None,
+) -> bool:
+    """
+    從 order[idx] 開始放（order[:idx] 已經放好）。
+    stop：外部要求中止時回 True（平行搜尋用），這時直接回 False。
+    """
+    if idx == len(order):
+        return True
+    if stop is not None and stop():
         return False
 
-    if not dfs_blocks(0):
-        raise RuntimeError("blocks 節點放置失敗（1..7）")
-
-    # -------------------------
-    # Part B: 放 leaf（在每個 2×2 block 內找 cell）
-    # leaf node id: 2*pid, 2*pid+1（對應 8..15）
-    # -------------------------
-    leaf_parents = [nid for nid, b in blocks.items() if b.area <= 4]  # 2x2 leaf blocks :contentReference[oaicite:5]{index=5}
-    leaf_parents = sorted(leaf_parents)
-
-    def leaf_candidates_in_parent_block(parent_id_: int) -> List[Tuple[int, int]]:
-        """在 parent 的 2×2 block 中找距離 parent 座標 = d_last 的空格"""
-        b = blocks[parent_id_]
-        pxy = (placed[parent_id_].x, placed[parent_id_].y)
-
-        cands = []
-        for x in range(b.x0, b.x1 + 1):
-            for y in range(b.y0, b.y1 + 1):
-                if grid.is_used(x, y):
-                    continue
-                if parent_child_dist(pxy, (x, y)) == d_last:
-                    cands.append((x, y))
-        return cands
-
-    def dfs_leaf(parent_idx: int) -> bool:
-        if parent_idx == len(leaf_parents):
+    nid = order[idx]
+    pid = parent_id(nid)
+    if pid not in placed:
+        return False
+    parent_xy = (placed[pid].x, placed[pid].y)
+
+    lyr = node_layer(nid)
+    target_dist = dists[lyr - 2]  # layer2 用 dists[0] ... :contentReference[oaicite:4]{index=4}
+
+    cands = candidates_for_node(grid, blocks, nid, parent_xy, target_dist)
+    if stats is not None:
+        stats.on_candidates(nid, len(cands))
+    for xy in cands:
+        cp = mark(grid, placed)
+        place_node_unchecked(grid, placed, nid, xy)
+        if stats is not None:
+            stats.on_expand(nid)
+        if (not prune or capacity_ok(grid, blocks, nid, xy, num_nodes)) and dfs_blocks(
+            grid, blocks, dists, placed, order, idx + 1, num_nodes, prune, stop, stats
+        ):
             return True
+        rollback(grid, placed, cp)
+        if stats is not None:
+            stats.on_backtrack(nid)
+    if stats is not None:
+        stats.on_dead_end(nid, len(placed))
+    return False
 
-        pid = leaf_parents[parent_idx]
-        # 兩個 leaf id（例如 pid=4 -> 8,9）
-        c1, c2 = pid * 2, pid * 2 + 1
-
-        cands = leaf_candidates_in_parent_block(pid)
-        # 我們需要挑兩個不同 cell
-        for i in range(len(cands)):
-            xy1 = cands[i]
-            placed[c1] = place_node_at(grid, c1, router_id=c1, core_id=-1, xy=xy1)
 
-            cands2 = leaf_candidates_in_parent_block(pid)  # 更新後再抓一次
-            for xy2 in cands2:
-                if xy2 == xy1:
-                    continue
-                placed[c2] = place_node_at(grid, c2, router_id=c2, core_id=-1, xy=xy2)
+# -------------------------
+# Part B: 放 leaf（在每個 2×2 block 內找 cell）
+# leaf node id: 2*pid, 2*pid+1（對應 8..15）
+# -------------------------
+def leaf_parents_of(blocks: Dict[int, Block]) -> List[int]:
+    return sorted(nid for nid, b in blocks.items() if b.area <= 4)  # 2x2 leaf blocks :contentReference[oaicite:5]{index=5}
 
-                if dfs_leaf(parent_idx + 1):
-                    return True
 
-                # 回朔 leaf2
-                remove_node_at(grid, xy2)
-                del placed[c2]
+def dfs_leaves(
+    grid,
+    blocks: Dict[int, Block],
+    dists,
+    placed: PlacedMap,
+    leaf_parents: List[int],
+    parent_idx: int,
+    stats: Optional[SearchStats] = None,
+    stop: Optional[Callable[[], bool]] = None,
+) -> bool:
+    """
+    從 leaf_parents[parent_idx] 開始，每個 parent 的兩個 leaf 一起放。
+    stop：跟 dfs_blocks 一樣，外部要求中止時直接回 False。
+    """
+    d_last = dists[-1]
 
-            # 回朔 leaf1
-            remove_node_at(grid, xy1)
-            del placed[c1]
+    def leaf_candidates_in_parent_block(parent_id_: int) -> List[Tuple[int, int]]:
+        """在 parent 的 2×2 block 中找距離 parent 座標 = d_last 的空格"""
+        pxy = (placed[parent_id_].x, placed[parent_id_].y)
+        return candidates_for_node(grid, blocks, parent_id_, pxy, d_last)
 
+    if parent_idx == len(leaf_parents):
+        return True
+    if stop is not None and stop():
         return False
 
-    if not dfs_leaf(0):
-        raise RuntimeError("leaf 放置失敗（在 2×2 block 內找 dist[-1] 位置）")
+    pid = leaf_parents[parent_idx]
+    # 兩個 leaf id（例如 pid=4 -> 8,9）
+    c1, c2 = pid * 2, pid * 2 + 1
+
+    cands = leaf_candidates_in_parent_block(pid)
+    if stats is not None:
+        stats.on_candidates(c1, len(cands))
+    # 我們需要挑兩個不同 cell
+    for xy1 in cands:
+        cp = mark(grid, placed)
+        place_node_unchecked(grid, placed, c1, xy1)
+        if stats is not None:
+            stats.on_expand(c1)
+
+        cands2 = leaf_candidates_in_parent_block(pid)  # 更新後再抓一次
+        if stats is not None:
+            stats.on_candidates(c2, len(cands2))
+        for xy2 in cands2:
+            cp2 = mark(grid, placed)
+            place_node_unchecked(grid, placed, c2, xy2)
+            if stats is not None:
+                stats.on_expand(c2)
+
+            if dfs_leaves(grid, blocks, dists, placed, leaf_parents, parent_idx + 1, stats, stop):
+                return True
 
-    return placed, grid
\ No newline at end of file
+            # 回朔 leaf2
+            rollback(grid, placed, cp2)
+            if stats is not None:
+                stats.on_backtrack(c2)
+        if stats is not None:
+            stats.on_dead_end(c2, len(placed))
+
+        # 回朔 leaf1
+        rollback(grid, placed, cp)
+        if stats is not None:
+            stats.on_backtrack(c1)
+
+    if stats is not None:
+        stats.on_dead_end(c1, len(placed))
+    return False
+
+
+def solve(
+    num: int,
+    grid_cls: Type[Grid] = Grid,
+    prune: bool = False,
+    ordering: str = "heap",
+    stats: Optional[SearchStats] = None,
+    root_search: bool = False,
+    cost: Optional[Callable[[Dict[int, Tuple[int, int]]], float]] = None,
+):
+    """
+    grid_cls: Grid 的 backend（預設 Grid；大尺寸可以用 ArrayGrid）
+    prune   : 每放一個 block 節點就用 free_count 檢查子孫 block 的容量，
+              不夠就立刻回朔（ArrayGrid 的 free_count 是 O(log W · log H)）
+    ordering: "heap" = 原本照 heap id 順序的 Part A / Part B
+              "mcv"  = dfs_mcv（候選最少的先放 + forward checking）
+    stats   : 給一個 SearchStats 就把搜尋過程的統計記進去（失敗 raise 之前也會記好）
+    root_search: True 時不固定 root，在 blocks[1] 裡找 cost 最低的 root 位置
+              （root_search.search_root；這時 prune / ordering / stats 用不到）
+    cost    : root_search 用的成本函式 positions -> float，預設離 root 的距離總和
+              （自訂 cost 時鏡射等價的 root 也會一個一個試）；
+              每個 root 只算 template 的那一種放法，結果是 template 下最好的 root，
+              不保證是所有 placement 裡成本最低的
+    """
+    if ordering not in ("heap", "mcv"):
+        raise ValueError("ordering 必須是 'heap' 或 'mcv'")
+
+    if root_search:
+        # root_search -> template_placement -> placement，只能在這裡 import
+        from algorithms.root_search import search_root
+
+        _, _, positions = search_root(num, cost=cost)
+        grid = grid_cls(*topology_cache.grid_shape(num))
+        placed = PlacedMap()
+        for nid in sorted(positions):
+            placed[nid] = place_node_at(grid, nid, router_id=nid, core_id=-1, xy=positions[nid])
+        grid.commit()
+        return placed, grid
+
+    grid, blocks, dists, placed = prepare_search(num, grid_cls, prune)
+    if stats is not None:
+        stats.meta.setdefault("num", num)
+        stats.meta.setdefault("ordering", ordering)
+        stats.meta.setdefault("prune", prune)
+        stats.ok = False
+
+    def timed(phase: str):
+        return stats.timer(phase) if stats is not None else nullcontext()
+
+    if ordering == "mcv":
+        with timed("mcv"):
+            ok = dfs_mcv(grid, blocks, dists, placed, num - 1, prune=prune, stats=stats)
+        if not ok:
+            raise RuntimeError("mcv 搜尋放置失敗")
+    else:
+        with timed("part_a"):
+            ok = dfs_blocks(
+                grid, blocks, dists, placed, block_order(blocks), 0, num - 1, prune, stats=stats
+            )
+        if not ok:
+            raise RuntimeError("blocks 節點放置失敗（1..7）")
+        with timed("part_b"):
+            ok = dfs_leaves(grid, blocks, dists, placed, leaf_parents_of(blocks), 0, stats=stats)
+        if not ok:
+            raise RuntimeError("leaf 放置失敗（在 2×2 block 內找 dist[-1] 位置）")
+    if stats is not None:
+        stats.ok = True
+
+    # 搜尋結束，trail 用不到了
+    grid.commit()
+    placed.commit()
+    return placed, grid
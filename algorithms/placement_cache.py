@@ -0,0 +1,254 @@
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, Type
+
+import numpy as np
+
+from algorithms.placement import SOLVER_VERSION, solve
+from algorithms.template_placement import TEMPLATE_VERSION, solve_template
+from algorithms.topology_cache import topology_cache
+from data_structure import Node, Grid, PlacedMap
+
+XY = Tuple[int, int]
+
+# 一列一個 heap id（index 0 不用，填 -1）
+PLACEMENT_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("router_id", "<i4"), ("core_id", "<i4")])
+
+# solver 名稱 -> (num, root_xy, grid_cls) -> (placed, grid)
+_SOLVERS: Dict[str, Callable] = {
+    "dfs": lambda num, root_xy, grid_cls: solve(num, grid_cls=grid_cls),
+    # 解不出來不在這裡 fallback，get_or_solve 改用 "dfs" 的 key，結果才不會記在 template 底下
+    "template": lambda num, root_xy, grid_cls: solve_template(
+        num, grid_cls=grid_cls, root_xy=root_xy, fallback=False
+    ),
+}
+
+# 每個 solver 自己的版本號，放進檔名；哪個 solver 改了只會讓它自己的舊檔失效
+_SOLVER_VERSIONS: Dict[str, int] = {
+    "dfs": SOLVER_VERSION,
+    "template": TEMPLATE_VERSION,
+}
+
+
+def placement_to_array(placed: Dict[int, Node], num: int) -> np.ndarray:
+    """placed -> PLACEMENT_DTYPE 陣列（長度 num，index = node_id）"""
+    arr = np.full(num, -1, dtype=PLACEMENT_DTYPE)
+    for nid, n in placed.items():
+        arr[nid] = (n.x, n.y, n.router_id, -1 if n.core_id is None else n.core_id)
+    return arr
+
+
+def array_to_placement(arr: np.ndarray, grid_cls: Type[Grid] = Grid):
+    """PLACEMENT_DTYPE 陣列 -> (placed, grid)，grid 的格子存 router_id"""
+    num = len(arr)
+    W, H = topology_cache.grid_shape(num)
+    grid = grid_cls(W, H)
+    placed = PlacedMap()
+    xs, ys = arr["x"].tolist(), arr["y"].tolist()
+    rids, cores = arr["router_id"].tolist(), arr["core_id"].tolist()
+    for nid in range(1, num):
+        if xs[nid] < 0:
+            continue
+        grid.place_unchecked(xs[nid], ys[nid], rids[nid])
+        placed[nid] = Node(x=xs[nid], y=ys[nid], router_id=rids[nid], core_id=cores[nid])
+    grid.commit()
+    return placed, grid
+
+
+class PlacementCache:
+    """
+    placement 快取，每個設定一個 .npy 檔：
+      key = (num, leaf_area, root 位置, solver 名稱 + 那個 solver 的版本號)
+
+    - 讀：np.load(mmap_mode="r")，不會整個讀進來，64K cores 也只要幾 ms
+    - 寫：先寫到同目錄的暫存檔再 os.replace，其他 process 不會讀到寫一半的檔
+    - 總大小超過 max_bytes 就從最久沒讀的檔開始刪（讀的時候會更新 mtime）
+    directory 沒給就用 $INTERCONNECT_CACHE_DIR；兩個都沒有的話只存在記憶體裡
+    （同一個 process 內共用，不會在磁碟上留檔案），一樣受 max_bytes 限制。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        if directory is None:
+            directory = os.environ.get("INTERCONNECT_CACHE_DIR") or None
+        if max_bytes < 1:
+            raise ValueError("max_bytes 必須 >= 1")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # directory 是 None 時用：檔名 -> 唯讀陣列，越後面越新
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    # ----- key / 檔名 -----
+
+    @staticmethod
+    def default_root(num: int) -> XY:
+        """solve 固定的 root 位置 (1, H-1)"""
+        _, H = topology_cache.grid_shape(num)
+        return (1, H - 1)
+
+    def path(self, num: int, leaf_area: int = 4, root_xy: Optional[XY] = None, solver: str = "dfs") -> str:
+        if solver not in _SOLVER_VERSIONS:
+            raise ValueError(f"solver 必須是 {sorted(_SOLVER_VERSIONS)} 其中之一")
+        if root_xy is None:
+            root_xy = self.default_root(num)
+        version = _SOLVER_VERSIONS[solver]
+        name = f"n{num}_a{leaf_area}_r{root_xy[0]}-{root_xy[1]}_{solver}_v{version}.npy"
+        if self.directory is None:
+            return name  # 只存記憶體時，檔名就是 key
+        return os.path.join(self.directory, name)
+
+    # ----- 讀寫 -----
+
+    def load(
+        self,
+        num: int,
+        leaf_area: int = 4,
+        root_xy: Optional[XY] = None,
+        solver: str = "dfs",
+    ) -> Optional[np.ndarray]:
+        """有就回傳唯讀（mmap）的 PLACEMENT_DTYPE 陣列，沒有或檔案壞掉回 None"""
+        path = self.path(num, leaf_area, root_xy, solver)
+        if self.directory is None:
+            arr = self._memory.get(path)
+            if arr is not None:
+                self._memory.move_to_end(path)
+            return arr
+        try:
+            arr = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._unlink(path)
+            return None
+        if arr.dtype != PLACEMENT_DTYPE or arr.shape != (num,):
+            del arr
+            self._unlink(path)
+            return None
+        try:
+            os.utime(path)  # 給 LRU 淘汰用
+        except OSError:
+            pass
+        return arr
+
+    def store(
+        self,
+        arr: np.ndarray,
+        leaf_area: int = 4,
+        root_xy: Optional[XY] = None,
+        solver: str = "dfs",
+    ) -> str:
+        """把 PLACEMENT_DTYPE 陣列寫進快取（原子性），回傳檔案路徑"""
+        arr = np.ascontiguousarray(arr, dtype=PLACEMENT_DTYPE)
+        path = self.path(len(arr), leaf_area, root_xy, solver)
+        if self.directory is None:
+            arr = arr.copy()
+            arr.setflags(write=False)
+            self._memory[path] = arr
+            self._memory.move_to_end(path)
+            self.evict(keep=path)
+            return path
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, arr)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            self._unlink(tmp)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def get_or_solve(
+        self,
+        num: int,
+        leaf_area: int = 4,
+        root_xy: Optional[XY] = None,
+        solver: str = "dfs",
+        grid_cls: Type[Grid] = Grid,
+    ):
+        """
+        回傳 (placed, grid)，跟 solve 一樣；快取沒有就用 solver 解完存起來。
+        solver："dfs"（placement.solve，只能用預設 root）或 "template"（solve_template）
+        template 解不出來時跟 solve_template 一樣 fallback 到 DFS（只有預設 root），
+        結果記在 "dfs" 的 key 底下。
+        """
+        if solver not in _SOLVERS:
+            raise ValueError(f"solver 必須是 {sorted(_SOLVERS)} 其中之一")
+        if leaf_area != 4:
+            raise ValueError("目前的 solver 只支援 leaf_area=4")
+        if solver == "dfs" and root_xy is not None and root_xy != self.default_root(num):
+            raise ValueError("dfs solver 的 root 固定在 (1, H-1)")
+
+        arr = self.load(num, leaf_area, root_xy, solver)
+        if arr is not None:
+            return array_to_placement(arr, grid_cls)
+
+        try:
+            placed, grid = _SOLVERS[solver](num, root_xy, grid_cls)
+        except RuntimeError:
+            if solver != "template" or root_xy not in (None, self.default_root(num)):
+                raise
+            return self.get_or_solve(num, leaf_area, None, "dfs", grid_cls)
+        self.store(placement_to_array(placed, num), leaf_area, root_xy, solver)
+        return placed, grid
+
+    # ----- 管理 -----
+
+    def entries(self):
+        """[(path, bytes, mtime), ...]；只存記憶體時 path 是檔名、mtime 是存取順序"""
+        if self.directory is None:
+            return [(name, arr.nbytes, i) for i, (name, arr) in enumerate(self._memory.items())]
+        out = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return out
+        for name in names:
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            out.append((path, st.st_size, st.st_mtime))
+        return out
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep: Optional[str] = None):
+        """總大小超過 max_bytes 時，從最久沒用的開始刪（keep 不刪）"""
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            self._remove(path)
+
+    def _remove(self, path: str):
+        if self.directory is None:
+            self._memory.pop(path, None)
+        else:
+            self._unlink(path)
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# 預設共用的快取
+placement_cache = PlacementCache()
@@ -0,0 +1,164 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from algorithms.placement import ring_cells
+from algorithms.template_placement import TemplateSolver
+
+XY = Tuple[int, int]
+Flip = Tuple[int, int]
+
+_FLIPS: Tuple[Flip, ...] = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+
+def mirror_permutation(solver: TemplateSolver, flip: Flip) -> np.ndarray:
+    """
+    對整張 grid 做 flip 鏡射時，node id 要怎麼換：
+    鏡射軸剛好是某一層的切割軸時，那一層 block 的兩個子節點對調；leaf 兩個照原本順序。
+    回傳 perm，perm[n] = 鏡射後 n 變成的 id（index 0 不用）。
+    """
+    num_nodes = solver.num_nodes
+    perm = np.zeros(num_nodes + 1, dtype=np.int64)
+    perm[1] = 1
+    for p in range(1, num_nodes + 1):
+        lvl = p.bit_length()
+        if 2 * p > num_nodes:
+            continue
+        swap = 0
+        if lvl < solver.depth:
+            swap = flip[0] if solver._split_x[lvl] else flip[1]
+        for k in (0, 1):
+            c = 2 * p + k
+            if c <= num_nodes:
+                perm[c] = 2 * perm[p] + (k ^ swap)
+    return perm
+
+
+def mirror_placement(xy: np.ndarray, perm: np.ndarray, flip: Flip, width: int, height: int) -> np.ndarray:
+    """xy 是 iter_placements 的陣列格式，回傳鏡射後的版本"""
+    out = np.empty_like(xy)
+    out[0] = xy[0]
+    out[perm[1:]] = xy[1:]
+    if flip[0]:
+        out[1:, 0] = width - 1 - out[1:, 0]
+    if flip[1]:
+        out[1:, 1] = height - 1 - out[1:, 1]
+    return out
+
+
+def _lex_le(a: np.ndarray, b: np.ndarray) -> bool:
+    diff = np.flatnonzero(a.ravel() != b.ravel())
+    return diff.size == 0 or a.ravel()[diff[0]] < b.ravel()[diff[0]]
+
+
+def iter_placements(
+    num: int,
+    limit: Optional[int] = None,
+    dedup: bool = True,
+    roots: Optional[List[XY]] = None,
+    solver: Optional[TemplateSolver] = None,
+) -> Iterator[np.ndarray]:
+    """
+    一個一個產生所有合法的放法（lazy，不會把解存起來）。
+
+    每個解是 shape (num, 2) 的整數陣列：第 i 列是 node i 的 (x, y)，第 0 列不用（-1）。
+    limit : 只要前 limit 個
+    dedup : 左右 / 上下鏡射後一樣的解只留 canonical 的那個（陣列 lexicographic 最小）
+    roots : 只列舉這些 root 位置（預設 blocks[1] 全部；dedup 時會換成軌道裡最小的那個）
+
+    節點照 heap id 順序放。放 block 節點 n 的時候，n 的 block 裡被占的只會是它的祖先，
+    所以 TemplateSolver.subtree_feasible(n, xy, 祖先) 是精確的可行性判斷，
+    block 節點不會走進整棵子樹都放不下的分支。
+    leaf 沒有另外檢查（兄弟兩個一起挑），一對 leaf 還是可能在第二個走到死路再回朔，
+    不過只差在 parent 的 2x2 block 裡，很便宜。
+    """
+    if solver is None:
+        solver = TemplateSolver(num)
+    W, H = solver.width, solver.height
+    num_nodes = solver.num_nodes
+    blocks = solver.blocks
+    dists = solver.dists
+    dtype = np.int16 if max(W, H) < np.iinfo(np.int16).max else np.int32
+
+    b1 = blocks[1]
+    if roots is None:
+        roots = [(x, y) for x in range(b1.x0, b1.x1 + 1) for y in range(b1.y0, b1.y1 + 1)]
+
+    def flip_xy(c: XY, f: Flip) -> XY:
+        return (W - 1 - c[0] if f[0] else c[0], H - 1 - c[1] if f[1] else c[1])
+
+    perms: Dict[Flip, np.ndarray] = {}
+    if dedup:
+        perms = {f: mirror_permutation(solver, f) for f in _FLIPS[1:]}
+        # 每個鏡射軌道只留最小的 root（其他 root 的解鏡射過來都會落在它身上）
+        roots = sorted({min(flip_xy(r, f) for f in _FLIPS) for r in roots})
+
+    order = list(range(2, num_nodes + 1))
+    count = 0
+    for root in roots:
+        if not solver.subtree_feasible(1, root):
+            continue
+        # root 鏡射後不動的那些 flip，解本身還要另外比 canonical
+        stabilizer = [f for f in perms if flip_xy(root, f) == root]
+
+        pos: Dict[int, XY] = {1: root}
+        occupied = {root}
+
+        def cands(nid: int) -> List[XY]:
+            p = nid // 2
+            dom = nid if nid in blocks else p
+            b = blocks[dom]
+            out = [
+                q
+                for q in ring_cells(b.x0, b.x1, b.y0, b.y1, pos[p], dists[nid.bit_length() - 2])
+                if q not in occupied
+            ]
+            if nid in blocks:
+                anc = []
+                a = p
+                while a:
+                    anc.append(pos[a])
+                    a //= 2
+                out = [q for q in out if solver.subtree_feasible(nid, q, anc)]
+            return out
+
+        if not order:
+            arr = np.full((num, 2), -1, dtype=dtype)
+            arr[1] = root
+            yield arr
+            count += 1
+            if limit is not None and count >= limit:
+                return
+            continue
+
+        # stack：每層 [候選, 下一個 index]
+        stack = [[cands(order[0]), 0]]
+        while stack:
+            depth = len(stack) - 1
+            nid = order[depth]
+            frame = stack[-1]
+            if nid in pos:
+                occupied.discard(pos.pop(nid))
+            if frame[1] == len(frame[0]):
+                stack.pop()
+                continue
+            xy = frame[0][frame[1]]
+            frame[1] += 1
+            pos[nid] = xy
+            occupied.add(xy)
+
+            if depth + 1 < len(order):
+                stack.append([cands(order[depth + 1]), 0])
+                continue
+
+            arr = np.full((num, 2), -1, dtype=dtype)
+            for n, q in pos.items():
+                arr[n] = q
+            if stabilizer and not all(
+                _lex_le(arr, mirror_placement(arr, perms[f], f, W, H)) for f in stabilizer
+            ):
+                continue
+            yield arr
+            count += 1
+            if limit is not None and count >= limit:
+                return
@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from algorithms.placement import ring_cells
+from algorithms.template_placement import TemplateSolver
+from algorithms.topology_cache import topology_cache
+from data_structure import Node
+
+XY = Tuple[int, int]
+
+# repair 自己管的 TemplateSolver memo：(num, leaf_area) -> memo
+# 最多留 _MEMO_CONFIGS 組，每組超過 _MEMO_MAX_KEYS 個子問題就在下一次 repair 前清掉
+_MEMO_CONFIGS = 4
+_MEMO_MAX_KEYS = 1 << 18
+_memos: "OrderedDict[Tuple[int, int], Dict]" = OrderedDict()
+
+
+def _repair_memo(num: int, leaf_area: int = 4) -> Dict:
+    key = (num, leaf_area)
+    memo = _memos.get(key)
+    if memo is None or len(memo) > _MEMO_MAX_KEYS:
+        memo = {}
+    _memos[key] = memo
+    _memos.move_to_end(key)
+    while len(_memos) > _MEMO_CONFIGS:
+        _memos.popitem(last=False)
+    return memo
+
+
+def affected_pairs(
+    num: int,
+    placed: Dict[int, Node],
+    moved: Iterable[int],
+    changed_cells: Iterable[XY],
+) -> Set[Tuple[int, int]]:
+    """
+    需要重算路徑的 (parent, child)：
+      - 有一端被搬動
+      - XY / YX 路徑經過的格子換了 router（changed_cells：搬動前後的格子）
+    路徑只有一段水平 + 一段垂直，用每列 / 每行的前綴和一次算完所有配對。
+    """
+    W, H = topology_cache.grid_shape(num)
+    tree = topology_cache.tree_index(num - 1)
+    moved = np.array(sorted(set(moved)), dtype=np.int64)
+    xs = np.full(num, -1, dtype=np.int64)
+    ys = np.full(num, -1, dtype=np.int64)
+    for nid, n in placed.items():
+        xs[nid], ys[nid] = n.x, n.y
+
+    mask = np.zeros((W, H), dtype=np.int64)
+    for x, y in changed_cells:
+        mask[x, y] = 1
+    # row[x, y] = mask[0..x-1, y] 的和；col[x, y] = mask[x, 0..y-1] 的和
+    row = np.zeros((W + 1, H), dtype=np.int64)
+    row[1:] = np.cumsum(mask, axis=0)
+    col = np.zeros((W, H + 1), dtype=np.int64)
+    col[:, 1:] = np.cumsum(mask, axis=1)
+
+    def horiz(y, xa, xb):
+        lo, hi = np.minimum(xa, xb), np.maximum(xa, xb)
+        return row[hi + 1, y] - row[lo, y]
+
+    def vert(x, ya, yb):
+        lo, hi = np.minimum(ya, yb), np.maximum(ya, yb)
+        return col[x, hi + 1] - col[x, lo]
+
+    out: Set[Tuple[int, int]] = set()
+    for parents, children in tree.pairs_by_level().values():
+        px, py, cx, cy = xs[parents], ys[parents], xs[children], ys[children]
+        hit = np.isin(parents, moved) | np.isin(children, moved)
+        # XY：先沿 y=py 走 X，再沿 x=cx 走 Y；YX：先沿 x=px 走 Y，再沿 y=cy 走 X
+        hit |= (horiz(py, px, cx) + vert(cx, py, cy)) > 0
+        hit |= (vert(px, py, cy) + horiz(cy, px, cx)) > 0
+        for i in np.flatnonzero(hit).tolist():
+            out.add((int(parents[i]), int(children[i])))
+    return out
+
+
+def repair_placement(
+    num: int,
+    placed: Dict[int, Node],
+    blocked: Iterable[XY],
+    grid=None,
+    solver: Optional[TemplateSolver] = None,
+) -> Tuple[List[int], Set[Tuple[int, int]]]:
+    """
+    有格子不能用（壞掉的 tile、保留給 IO / memory controller）時，局部修補既有的 placed。
+
+    blocked: 目前所有不能用的格子（要包含之前就 blocked 的）
+    grid   : 有給的話一起更新（格子存 router_id）
+    solver : 可以重複用同一個 TemplateSolver(num, blocked=...)；沒給的話新建的 solver
+             會共用這個模組留著的 memo（有上限），重複修補同一個 num 不用從頭解
+
+    做法：站在 blocked 格子上的節點，從它自己開始往祖先爬，找第一個能在自己 block 裡
+    重新放好的子樹（TemplateSolver.subtree_feasible 判斷）。重放的時候每個子節點
+    原本的位置還合法就留著，整棵子樹沒有撞到的話直接整棵不動，
+    所以只有真的需要換位置的節點會被搬（Node 物件原地改 x, y，router_id / core_id 保留）。
+
+    注意 grid 只比節點數多一格，blocked 掉一個有節點的格子，那個空格就得「搬」過去，
+    要動到的是同時包含兩格的最小 block 那棵子樹。
+
+    回傳 (被搬動的 node_id, 需要重算路徑的 (parent, child))，
+    後者可以直接丟給 interconnect.refresh_routes。
+    """
+    blocked = frozenset(blocked)
+    if solver is None or not blocked <= solver.blocked:
+        solver = TemplateSolver(num, blocked=blocked, memo=_repair_memo(num))
+    blocks = solver.blocks
+    dists = solver.dists
+    num_nodes = num - 1
+
+    pos: Dict[int, XY] = {nid: (n.x, n.y) for nid, n in placed.items()}
+    cells: Dict[XY, int] = {xy: nid for nid, xy in pos.items()}
+    new_pos: Dict[int, XY] = {}
+
+    def in_subtree(nid: int, root: int) -> bool:
+        while nid > root:
+            nid //= 2
+        return nid == root
+
+    def ancestors(nid: int) -> List[XY]:
+        out = []
+        a = nid // 2
+        while a:
+            out.append(pos[a])
+            a //= 2
+        return out
+
+    def ring(nid: int, parent_xy: XY) -> List[XY]:
+        b = blocks[nid if nid in blocks else nid // 2]
+        return list(ring_cells(b.x0, b.x1, b.y0, b.y1, parent_xy, dists[nid.bit_length() - 2]))
+
+    def untouched(nid: int, forbidden: Set[XY]) -> bool:
+        """nid 的子樹目前的格子都沒撞到 forbidden"""
+        return not any(f in cells and in_subtree(cells[f], nid) for f in forbidden)
+
+    def replace(nid: int, xy: XY, anc: List[XY]):
+        """nid 放到 xy（已確認可行），子節點盡量留在原位"""
+        new_pos[nid] = xy
+        anc = anc + [xy]
+        forbidden = set(anc) | blocked
+        kids = [c for c in (nid * 2, nid * 2 + 1) if c <= num_nodes]
+        if kids and kids[0] not in blocks:
+            # leaf：兩個一起挑，原位還合法就留著
+            ok = set(q for q in ring(kids[0], xy) if q not in forbidden)
+            keep = [c for c in kids if pos[c] in ok]
+            taken = {pos[c] for c in keep}
+            free = [q for q in ring(kids[0], xy) if q in ok and q not in taken]
+            for c in kids:
+                new_pos[c] = pos[c] if c in keep else free.pop(0)
+            return
+        for c in kids:
+            cands = [q for q in ring(c, xy) if q not in forbidden]
+            if pos[c] in cands:
+                cands.remove(pos[c])
+                cands.insert(0, pos[c])
+            for q in cands:
+                if q == pos[c] and untouched(c, forbidden):
+                    break  # 整棵不動
+                if solver.subtree_feasible(c, q, anc):
+                    replace(c, q, anc)
+                    break
+            else:
+                raise RuntimeError(f"node {c} 找不到位置（subtree_feasible 不應該走到這裡）")
+
+    def repair(nid: int):
+        if nid not in blocks:
+            nid //= 2  # leaf 跟兄弟一起在 parent 的 block 裡重挑
+        while True:
+            anc = ancestors(nid)
+            if nid == 1:
+                b = blocks[1]
+                cur = pos[1]
+                options = [(x, y) for x in range(b.x0, b.x1 + 1) for y in range(b.y0, b.y1 + 1)]
+                options.sort(key=lambda q: abs(q[0] - cur[0]) + abs(q[1] - cur[1]))
+            else:
+                options = ring(nid, pos[nid // 2])
+                if pos[nid] in options:
+                    options.remove(pos[nid])
+                    options.insert(0, pos[nid])
+            for xy in options:
+                if xy in blocked or xy in anc:
+                    continue
+                if solver.subtree_feasible(nid, xy, anc):
+                    replace(nid, xy, anc)
+                    return
+            if nid == 1:
+                raise RuntimeError(f"blocked 之後沒辦法放（blocked={sorted(blocked)}）")
+            nid //= 2
+
+    old_pos: Dict[int, XY] = {}
+    while True:
+        bad = [nid for nid, xy in pos.items() if xy in blocked]
+        if not bad:
+            break
+        new_pos.clear()
+        repair(min(bad))
+        for nid in new_pos:
+            del cells[pos[nid]]
+        for nid, xy in new_pos.items():
+            if xy != pos[nid]:
+                old_pos.setdefault(nid, pos[nid])
+            pos[nid] = xy
+            cells[xy] = nid
+
+    moved = sorted(nid for nid, xy in old_pos.items() if pos[nid] != xy)
+    if grid is not None:
+        for nid in moved:
+            grid.remove(*old_pos[nid])
+        for nid in moved:
+            grid.place(*pos[nid], placed[nid].router_id)
+    for nid in moved:
+        placed[nid].x, placed[nid].y = pos[nid]
+
+    changed = {old_pos[nid] for nid in moved} | {pos[nid] for nid in moved}
+    return moved, affected_pairs(num, placed, moved, changed)
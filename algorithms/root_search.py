@@ -0,0 +1,108 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from algorithms.template_placement import TemplateSolver
+from algorithms.topology_cache import topology_cache
+
+XY = Tuple[int, int]
+CostFn = Callable[[Dict[int, XY]], float]
+BoundFn = Callable[[XY], float]
+
+
+def root_distance_cost(positions: Dict[int, XY]) -> float:
+    """
+    預設成本：每個節點到 root 的 Manhattan 距離總和。
+    （parent-child 的線長每層都是固定的 level_dist，總和跟 root 放哪無關，
+      所以拿「離 root 多遠」當延遲的代理指標）
+    """
+    rx, ry = positions[1]
+    return float(sum(abs(x - rx) + abs(y - ry) for x, y in positions.values()))
+
+
+def root_distance_bound(num: int) -> BoundFn:
+    """
+    root_distance_cost 的下界：每個節點到 root 至少是 root 到它所在 block 的距離
+    （leaf 用 parent 的 block）。回傳 root_xy -> 下界。
+    """
+    x0, x1, y0, y1 = topology_cache.partition_arrays(num)
+    num_nodes = num - 1
+    ids = np.arange(2, num_nodes + 1)
+    # leaf 沒有自己的 block，往上找到有 block 的祖先（就是 parent）
+    bid = np.where(ids < len(x0), ids, ids // 2)
+    bx0, bx1, by0, by1 = x0[bid], x1[bid], y0[bid], y1[bid]
+
+    def bound(root_xy: XY) -> float:
+        rx, ry = root_xy
+        dx = np.maximum(np.maximum(bx0 - rx, rx - bx1), 0)
+        dy = np.maximum(np.maximum(by0 - ry, ry - by1), 0)
+        return float((dx + dy).sum())
+
+    return bound
+
+
+def _root_orbit(root_xy: XY, width: int, height: int) -> List[XY]:
+    """root 在 grid 左右 / 上下鏡射下的等價位置"""
+    x, y = root_xy
+    return [
+        (width - 1 - x if fx else x, height - 1 - y if fy else y)
+        for fx in (0, 1)
+        for fy in (0, 1)
+    ]
+
+
+def search_root(
+    num: int,
+    cost: Optional[CostFn] = None,
+    bound: Optional[BoundFn] = None,
+    symmetric: Optional[bool] = None,
+    solver: Optional[TemplateSolver] = None,
+) -> Tuple[float, XY, Dict[int, XY]]:
+    """
+    在 blocks[1] 裡找 root 位置，回傳成本最低的 (cost, root_xy, node_id -> (x, y))。
+
+    cost     : positions -> 成本，預設 root_distance_cost
+    bound    : root_xy -> 成本下界；用預設 cost 時自動用 root_distance_bound，
+               自訂 cost 沒給 bound 就不做 branch-and-bound
+    symmetric: partition 對左右 / 上下鏡射是對稱的，鏡射後等價的 root 只試一個
+               （cost 本身也要對鏡射不變才能開）；None = 只有用預設 cost 時才開
+
+    每個 root 只評估 TemplateSolver.place 給的那一種放法，所以回傳的是「這個 template 下」
+    最好的 root，不是所有合法 placement 裡成本最低的。
+
+    每個 root 先用 TemplateSolver.subtree_feasible 判斷放不放得下（子問題有 memo，很便宜），
+    再照下界由小到大試，下界 >= 目前最好的成本就停。
+    """
+    if symmetric is None:
+        symmetric = cost is None
+    if cost is None:
+        cost = root_distance_cost
+        if bound is None:
+            bound = root_distance_bound(num)
+    if solver is None:
+        solver = TemplateSolver(num)
+
+    b = solver.blocks[1]
+    roots = [(x, y) for x in range(b.x0, b.x1 + 1) for y in range(b.y0, b.y1 + 1)]
+    if symmetric:
+        roots = [r for r in roots if r == min(_root_orbit(r, solver.width, solver.height))]
+
+    if bound is not None:
+        scored = sorted((bound(r), r) for r in roots)
+    else:
+        scored = [(float("-inf"), r) for r in roots]
+
+    best: Optional[Tuple[float, XY, Dict[int, XY]]] = None
+    for lb, r in scored:
+        if best is not None and lb >= best[0]:
+            break
+        if not solver.subtree_feasible(1, r):
+            continue
+        positions = solver.place(r)
+        c = cost(positions)
+        if best is None or c < best[0]:
+            best = (c, r, positions)
+
+    if best is None:
+        raise RuntimeError("blocks[1] 裡沒有放得下的 root 位置")
+    return best
@@ -0,0 +1,206 @@
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from data_structure import Node, RouterIndex
+from data_structure.router_index import NO_ROUTER
+
+XY = Tuple[int, int]
+
+ROUTING_TABLE_VERSION = 1
+
+# next_dir 裡的方向碼
+ARRIVED, EAST, WEST, NORTH, SOUTH = 0, 1, 2, 3, 4
+# 方向碼 -> (dx, dy)
+DIR_DELTA = np.array([(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int64)
+
+
+def _dir_codes(cur: np.ndarray, dst: np.ndarray, pos: int, neg: int) -> np.ndarray:
+    """cur 往 dst 走一步的方向碼（同一格就是 ARRIVED）"""
+    return np.where(dst > cur, pos, np.where(dst < cur, neg, ARRIVED)).astype(np.int8)
+
+
+class RoutingTable:
+    """
+    dimension-order routing（XY / YX）的全配對 next-hop 表。
+
+    next_dir[dst_router, cell]：封包在 cell（= x * height + y）要去 dst_router 時往哪走，
+    int8 方向碼（ARRIVED / EAST / WEST / NORTH / SOUTH）。一列是一個目的地，
+    查一條路徑只會讀同一列，4K routers 整張表 16 MB，可以存檔後 mmap 回來用。
+
+    表是照「格子」存而不是照 router：路徑經過沒有 router 的格子（grid 只比節點多一格）
+    也走得下去，遇到的時候怎麼處理由 path(..., missing=) 決定（跟 RouterIndex 一樣）。
+    """
+
+    def __init__(self, next_dir: np.ndarray, index: RouterIndex, order: str = "XY"):
+        if order not in ("XY", "YX"):
+            raise ValueError("order 必須是 'XY' 或 'YX'")
+        self.next_dir = next_dir
+        self.index = index
+        self.order = order
+        self.width = index.width
+        self.height = index.height
+
+    # ----- 編譯 -----
+
+    @classmethod
+    def compile(
+        cls,
+        placement: Union[RouterIndex, Dict[int, Node]],
+        order: str = "XY",
+        chunk: int = 256,
+    ) -> "RoutingTable":
+        """
+        placement 可以是 RouterIndex 或 placed（node_id -> Node）。
+        每次處理 chunk 個目的地，中間陣列不會跟整張表一樣大。
+        """
+        if order not in ("XY", "YX"):
+            raise ValueError("order 必須是 'XY' 或 'YX'")
+        index = placement if isinstance(placement, RouterIndex) else RouterIndex.from_placed(placement)
+        W, H = index.width, index.height
+        cells = np.arange(W * H, dtype=np.int64)
+        cx, cy = cells // H, cells % H
+        dst_xy = index.router_xy.astype(np.int64)
+        num_routers = len(dst_xy)
+
+        next_dir = np.zeros((num_routers, W * H), dtype=np.int8)
+        for lo in range(0, num_routers, chunk):
+            dx = dst_xy[lo:lo + chunk, 0:1]
+            dy = dst_xy[lo:lo + chunk, 1:2]
+            step_x = _dir_codes(cx[None, :], dx, EAST, WEST)
+            step_y = _dir_codes(cy[None, :], dy, NORTH, SOUTH)
+            if order == "XY":
+                block = np.where(step_x != ARRIVED, step_x, step_y)
+            else:
+                block = np.where(step_y != ARRIVED, step_y, step_x)
+            # 沒有放 router 的 id（例如 0）整列留 ARRIVED
+            block[dx[:, 0] < 0] = ARRIVED
+            next_dir[lo:lo + chunk] = block
+        return cls(next_dir, index, order)
+
+    # ----- 查詢 -----
+
+    def _cell(self, x: int, y: int) -> int:
+        return x * self.height + y
+
+    def _router_cell(self, router_id: int) -> int:
+        xy = self.index.xy_of(router_id)
+        if xy is None or router_id >= len(self.next_dir):
+            raise ValueError(f"router {router_id} 不在這個 placement 裡")
+        return self._cell(*xy)
+
+    def next_cell(self, xy: XY, dst_router: int) -> Optional[XY]:
+        """在 xy 要去 dst_router 的下一格；已經到了回 None"""
+        self._router_cell(dst_router)
+        d = int(self.next_dir[dst_router, self._cell(*xy)])
+        if d == ARRIVED:
+            return None
+        ddx, ddy = DIR_DELTA[d]
+        return xy[0] + int(ddx), xy[1] + int(ddy)
+
+    def next_hop(self, router_id: int, dst_router: int) -> int:
+        """
+        router_id 往 dst_router 的下一個 router；已經到了回 dst_router 自己。
+        下一格沒有 router 的話回 NO_ROUTER（要穿過去請用 path）。
+        """
+        x, y = self.index.xy_of(router_id) or (-1, -1)
+        if x < 0:
+            raise ValueError(f"router {router_id} 不在這個 placement 裡")
+        nxt = self.next_cell((x, y), dst_router)
+        if nxt is None:
+            return dst_router
+        return self.index.router_at(*nxt, missing="keep")
+
+    def path_cells(self, src_router: int, dst_router: int) -> Iterator[XY]:
+        """src 到 dst 逐格的座標（含兩端）"""
+        cell = self._router_cell(src_router)
+        self._router_cell(dst_router)
+        row = self.next_dir[dst_router]
+        H = self.height
+        while True:
+            x, y = divmod(cell, H)
+            yield x, y
+            d = row[cell]
+            if d == ARRIVED:
+                return
+            ddx, ddy = DIR_DELTA[d]
+            cell += int(ddx) * H + int(ddy)
+
+    def path(self, src_router: int, dst_router: int, missing: str = "raise") -> Iterator[int]:
+        """
+        src 到 dst 逐格的 router_id（含兩端）。
+        經過沒有 router 的格子：missing="raise" 丟 ValueError、"skip" 跳過、"keep" 給 NO_ROUTER
+        """
+        router_at = self.index.router_at
+        for x, y in self.path_cells(src_router, dst_router):
+            r = router_at(x, y, missing)
+            if r == NO_ROUTER and missing == "skip":
+                continue
+            yield r
+
+    # ----- 存檔 -----
+
+    def save(self, directory: str) -> str:
+        """
+        存成一個目錄：next_dir.npy、cell_router.npy、meta.json。
+        每個檔先寫暫存檔再 os.replace，最後才寫 meta.json（有 meta 就代表整組寫完了）。
+        """
+        os.makedirs(directory, exist_ok=True)
+        meta = {
+            "version": ROUTING_TABLE_VERSION,
+            "order": self.order,
+            "width": self.width,
+            "height": self.height,
+        }
+        try:
+            os.remove(os.path.join(directory, "meta.json"))  # 覆寫舊的表時，寫完之前不算數
+        except FileNotFoundError:
+            pass
+        self._atomic_save(directory, "next_dir.npy", lambda f: np.save(f, np.ascontiguousarray(self.next_dir)))
+        self._atomic_save(directory, "cell_router.npy", lambda f: np.save(f, self.index.cell_router))
+        self._atomic_save(directory, "meta.json", lambda f: f.write(json.dumps(meta).encode()))
+        return directory
+
+    @staticmethod
+    def _atomic_save(directory: str, name: str, write):
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, os.path.join(directory, name))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "RoutingTable":
+        """讀回 save 的目錄；mmap=True 時 next_dir 是唯讀的 memmap，不會整張讀進來"""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != ROUTING_TABLE_VERSION:
+            raise ValueError(f"routing table 版本不合（{meta.get('version')} != {ROUTING_TABLE_VERSION}）")
+        next_dir = np.load(os.path.join(directory, "next_dir.npy"), mmap_mode="r" if mmap else None)
+        cell_router = np.load(os.path.join(directory, "cell_router.npy"))
+        if cell_router.shape != (meta["width"], meta["height"]) or next_dir.shape[1] != cell_router.size:
+            raise ValueError("routing table 檔案的大小對不起來")
+
+        index = RouterIndex(meta["width"], meta["height"])
+        xs, ys = np.nonzero(cell_router != NO_ROUTER)
+        index._fill_arrays(xs, ys, cell_router[xs, ys].astype(np.int64))
+        return cls(next_dir, index, meta["order"])
+
+
+def compile_routing_table(
+    placement: Union[RouterIndex, Dict[int, Node]],
+    order: str = "XY",
+) -> RoutingTable:
+    """RoutingTable.compile 的簡寫"""
+    return RoutingTable.compile(placement, order)
@@ -0,0 +1,90 @@
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, DefaultDict, Dict, Iterator, Optional, TextIO
+
+
+class SearchStats:
+    """
+    placement DFS 的統計（solve(..., stats=SearchStats()) 時才會收集）：
+      - expanded        : 試放了幾次（每放一個節點算一次）
+      - backtracks      : layer -> 放了又拿掉的次數
+      - candidate_sizes : layer -> {候選格數: 出現次數}
+      - times           : 各階段花的秒數（"part_a" = block 節點、"part_b" = leaf、
+                          "mcv" = dfs_mcv，它不分 Part A / Part B）
+      - deepest_failure : 候選全部試完還是失敗的地方裡，已放節點最多的那一次
+                          {"depth": 已放節點數, "node_id": .., "layer": ..}
+    to_dict() 拿結構化的結果，write_jsonl() 一行一筆寫出去。
+    """
+
+    def __init__(self, **meta: Any):
+        # meta：自己想記的東西（num、ordering ...），會放進 summary 那一筆
+        self.meta: Dict[str, Any] = dict(meta)
+        self.ok: Optional[bool] = None
+        self.expanded = 0
+        self.backtracks: DefaultDict[int, int] = defaultdict(int)
+        self.candidate_sizes: DefaultDict[int, Counter] = defaultdict(Counter)
+        self.times: Dict[str, float] = {}
+        self.deepest_failure: Optional[Dict[str, int]] = None
+
+    # ----- 搜尋時呼叫 -----
+
+    def on_candidates(self, node_id: int, n: int):
+        self.candidate_sizes[node_id.bit_length()][n] += 1
+
+    def on_expand(self, node_id: int):
+        self.expanded += 1
+
+    def on_backtrack(self, node_id: int):
+        self.backtracks[node_id.bit_length()] += 1
+
+    def on_dead_end(self, node_id: int, depth: int):
+        if self.deepest_failure is None or depth > self.deepest_failure["depth"]:
+            self.deepest_failure = {"depth": depth, "node_id": node_id, "layer": node_id.bit_length()}
+
+    @contextmanager
+    def timer(self, phase: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[phase] = self.times.get(phase, 0.0) + time.perf_counter() - t0
+
+    # ----- 輸出 -----
+
+    def layer_summary(self, layer: int) -> Dict[str, Any]:
+        sizes = self.candidate_sizes.get(layer, Counter())
+        count = sum(sizes.values())
+        return {
+            "layer": layer,
+            "backtracks": self.backtracks.get(layer, 0),
+            "candidate_sets": count,
+            "candidates_mean": (sum(k * v for k, v in sizes.items()) / count) if count else 0.0,
+            "candidates_max": max(sizes) if sizes else 0,
+            "candidates_hist": {str(k): v for k, v in sorted(sizes.items())},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        layers = sorted(set(self.backtracks) | set(self.candidate_sizes))
+        return {
+            **self.meta,
+            "ok": self.ok,
+            "expanded": self.expanded,
+            "backtracks": sum(self.backtracks.values()),
+            "times": dict(self.times),
+            "deepest_failure": self.deepest_failure,
+            "layers": [self.layer_summary(lvl) for lvl in layers],
+        }
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """JSON lines 用：先一筆 summary，再每層一筆"""
+        d = self.to_dict()
+        layers = d.pop("layers")
+        yield {"type": "summary", **d}
+        for rec in layers:
+            yield {"type": "layer", **self.meta, **rec}
+
+    def write_jsonl(self, fp: TextIO):
+        for rec in self.records():
+            fp.write(json.dumps(rec, ensure_ascii=False) + "\n")
@@ -0,0 +1,241 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from algorithms.area_partition import partition_depth
+from algorithms.placement import solve, subtree_size, ring_cells
+from algorithms.topology_cache import topology_cache
+from data_structure import Node, Grid, PlacedMap
+
+XY = Tuple[int, int]
+# (level, 節點在 block 內的相對座標, block 內已被占用的相對座標(排序過))
+StateKey = Tuple[int, XY, Tuple[XY, ...]]
+
+# template 的放法（子問題怎麼解、鏡射怎麼選 ...）改了、結果會不一樣時要 +1；
+# 跟 placement.SOLVER_VERSION 一樣給磁碟上的 placement cache 判斷舊檔用
+TEMPLATE_VERSION = 1
+
+
+class TemplateSolver:
+    """
+    建構式（template）放置。
+
+    area partition 是自我相似的：同一層的 block 形狀都一樣，level_dist 的距離也只跟層有關。
+    而且某個節點的兩個子樹各自被關在不重疊的子 block 裡，所以只要 parent 位置決定了，
+    兩邊可以分開解，不需要跨兄弟回朔。
+
+    一個子問題只由下面三件事決定（都用 block 內的相對座標）：
+      level、節點自己的位置、block 裡已經被祖先（或 blocked 格子）占掉的格子
+    把它對 block 做左右 / 上下鏡射後取最小的當 canonical key，解一次就存起來；
+    其他同形狀的 block 直接平移 / 鏡射套用，整棵樹是 O(n) 組出來的。
+    """
+
+    def __init__(
+        self,
+        num: int,
+        leaf_area: int = 4,
+        blocked: Iterable[XY] = (),
+        memo: Optional[Dict[StateKey, Optional[Tuple[XY, ...]]]] = None,
+    ):
+        self.num = num
+        self.num_nodes = num - 1
+        self.blocks = topology_cache.area_partition(num, leaf_area=leaf_area)
+        self.width, self.height = topology_cache.grid_shape(num)
+        _, self.dists = topology_cache.inter_layer_distances(num)
+        self.depth = partition_depth(num, leaf_area)
+        self.blocked = frozenset(blocked)
+
+        # 每層 block 的 (w, h) 與兩個子 block 的相對位置 (ox, oy, w, h)
+        self._shape: Dict[int, XY] = {}
+        self._children: Dict[int, List[Tuple[int, int, int, int]]] = {}
+        self._split_x: Dict[int, bool] = {}
+        for lvl in range(1, self.depth + 1):
+            b = self.blocks[1 << (lvl - 1)]
+            self._shape[lvl] = (b.w, b.h)
+            if lvl < self.depth:
+                kids = []
+                for c in (b, self.blocks[2 << (lvl - 1)], self.blocks[(2 << (lvl - 1)) + 1]):
+                    kids.append((c.x0 - b.x0, c.y0 - b.y0, c.w, c.h))
+                self._children[lvl] = kids[1:]
+                self._split_x[lvl] = kids[1][0] != kids[2][0]
+
+        # 最後一層 block 節點底下有幾個 leaf（num=2 時沒有）
+        first_leaf = 1 << self.depth
+        self._leaf_count = 2 if first_leaf + 1 <= self.num_nodes else 0
+
+        # 每層 block 最多能讓外人（祖先 / blocked）占幾格：面積 - 子樹節點數
+        self._slack: Dict[int, int] = {}
+        for lvl in range(1, self.depth + 1):
+            w, h = self._shape[lvl]
+            self._slack[lvl] = w * h - subtree_size(1 << (lvl - 1), self.num_nodes)
+
+        # 子問題的 key 已經包含被占的格子（blocked 也算在裡面），答案跟 blocked 無關，
+        # 所以同一個 num / leaf_area 的 solver 可以傳同一個 memo 進來共用（例如修補時不用從頭解）；
+        # 沒給就自己用一份新的。memo 由呼叫端管大小，solve 到一半不能丟 key。
+        self._memo: Dict[StateKey, Optional[Tuple[XY, ...]]] = {} if memo is None else memo
+
+    # ----- canonical key -----
+
+    def _canon(self, level: int, pos: XY, taken: Iterable[XY]) -> Tuple[StateKey, XY]:
+        """回傳 (canonical key, (fx, fy))；(fx, fy) 是把實際座標轉成 canonical 用的鏡射"""
+        w, h = self._shape[level]
+        taken = list(taken)
+        best = None
+        for fx in (0, 1):
+            for fy in (0, 1):
+                def t(c: XY) -> XY:
+                    return (w - 1 - c[0] if fx else c[0], h - 1 - c[1] if fy else c[1])
+                key = (level, t(pos), tuple(sorted(t(c) for c in taken)))
+                if best is None or key < best[0]:
+                    best = (key, (fx, fy))
+        return best
+
+    @staticmethod
+    def _flip(c: XY, flip: XY, w: int, h: int) -> XY:
+        return (w - 1 - c[0] if flip[0] else c[0], h - 1 - c[1] if flip[1] else c[1])
+
+    # ----- 解子問題 -----
+
+    def _solve(self, key: StateKey) -> Optional[Tuple[XY, ...]]:
+        """
+        在 canonical frame 解一個子問題：
+          - 非最後一層：兩個子 block 各一筆 (子節點相對座標, 子問題 key, 子問題的鏡射)
+          - 最後一層  ：leaf 的相對座標（兩個）
+        解不出來回 None。
+        """
+        if key in self._memo:
+            return self._memo[key]
+
+        level, pos, taken = key
+        if len(taken) > self._slack[level]:
+            self._memo[key] = None
+            return None
+
+        w, h = self._shape[level]
+        occupied = set(taken)
+        occupied.add(pos)
+        d = self.dists[level - 1] if level - 1 < len(self.dists) else 0
+
+        sol: Optional[Tuple[XY, ...]]
+        if level == self.depth:
+            cells = []
+            if self._leaf_count:
+                for q in ring_cells(0, w - 1, 0, h - 1, pos, d):
+                    if q not in occupied:
+                        cells.append(q)
+                        if len(cells) == self._leaf_count:
+                            break
+            sol = tuple(cells) if len(cells) == self._leaf_count else None
+        else:
+            picks: list = []
+            for ox, oy, cw, ch in self._children[level]:
+                found = None
+                for q in ring_cells(ox, ox + cw - 1, oy, oy + ch - 1, pos, d):
+                    if q in occupied:
+                        continue
+                    inside = [
+                        (cx - ox, cy - oy)
+                        for cx, cy in occupied
+                        if ox <= cx < ox + cw and oy <= cy < oy + ch
+                    ]
+                    if len(inside) > self._slack[level + 1]:
+                        continue
+                    child_key, child_flip = self._canon(level + 1, (q[0] - ox, q[1] - oy), inside)
+                    if self._solve(child_key) is not None:
+                        found = (q, child_key, child_flip)
+                        break
+                if found is None:
+                    break
+                picks.append(found)
+            sol = tuple(picks) if len(picks) == len(self._children[level]) else None
+
+        self._memo[key] = sol
+        return sol
+
+    def _state(self, node_id: int, xy: XY, taken_abs: Iterable[XY]) -> Tuple[StateKey, XY]:
+        """node_id 放在絕對座標 xy、祖先占了 taken_abs 時的 canonical key"""
+        b = self.blocks[node_id]
+        taken = [
+            (x - b.x0, y - b.y0)
+            for x, y in set(taken_abs) | self.blocked
+            if b.x0 <= x <= b.x1 and b.y0 <= y <= b.y1 and (x, y) != xy
+        ]
+        return self._canon(node_id.bit_length(), (xy[0] - b.x0, xy[1] - b.y0), taken)
+
+    def subtree_feasible(self, node_id: int, xy: XY, taken_abs: Iterable[XY] = ()) -> bool:
+        """node_id 放在 xy（祖先占了 taken_abs）時，它整棵子樹放不放得下"""
+        if xy in self.blocked:
+            return False
+        key, _ = self._state(node_id, xy, taken_abs)
+        return self._solve(key) is not None
+
+    # ----- 組出整棵樹 -----
+
+    def place(self, root_xy: XY) -> Optional[Dict[int, XY]]:
+        """root 固定在 root_xy，回傳 node_id -> (x, y)；放不下回 None"""
+        return self.place_subtree(1, root_xy, ())
+
+    def place_subtree(self, node_id: int, xy: XY, taken_abs: Iterable[XY]) -> Optional[Dict[int, XY]]:
+        """只放 node_id 這棵子樹（node_id 在 xy，祖先占了 taken_abs）"""
+        if not self.subtree_feasible(node_id, xy, taken_abs):
+            return None
+
+        key, flip = self._state(node_id, xy, taken_abs)
+        out: Dict[int, XY] = {node_id: xy}
+        # 往下展開時直接沿用記下來的子問題 key；鏡射是 Z2 x Z2，一路 XOR 上去就好
+        stack = [(node_id, key, flip)]
+        while stack:
+            nid, key, flip = stack.pop()
+            b = self.blocks[nid]
+            level = nid.bit_length()
+            w, h = self._shape[level]
+            sol = self._memo[key]
+
+            if level == self.depth:
+                for i, q in enumerate(sol):
+                    fq = self._flip(q, flip, w, h)
+                    out[nid * 2 + i] = (b.x0 + fq[0], b.y0 + fq[1])
+                continue
+
+            # 鏡射軸剛好是這層的切割軸時，兩個子 block 對調
+            swap = flip[0] if self._split_x[level] else flip[1]
+            for k in (0, 1):
+                q, child_key, child_flip = sol[k ^ swap]
+                fq = self._flip(q, flip, w, h)
+                out[nid * 2 + k] = (b.x0 + fq[0], b.y0 + fq[1])
+                stack.append((nid * 2 + k, child_key, (flip[0] ^ child_flip[0], flip[1] ^ child_flip[1])))
+        return out
+
+
+def solve_template(
+    num: int,
+    grid_cls: Type[Grid] = Grid,
+    root_xy: Optional[XY] = None,
+    fallback: bool = True,
+):
+    """
+    建構式放置，回傳格式跟 placement.solve 一樣：(placed, grid)。
+    root 預設跟 solve 一樣固定在 (1, H-1)；template 解不出來時 fallback 到 DFS 的 solve
+    （solve 只會用預設 root，所以自訂 root_xy 失敗時直接 raise）。
+    """
+    solver = TemplateSolver(num)
+    default_root = (1, solver.height - 1)
+    if root_xy is None:
+        root_xy = default_root
+
+    b = solver.blocks[1]
+    positions = None
+    if b.x0 <= root_xy[0] <= b.x1 and b.y0 <= root_xy[1] <= b.y1:
+        positions = solver.place(root_xy)
+
+    if positions is None:
+        if fallback and root_xy == default_root:
+            return solve(num, grid_cls=grid_cls, prune=True)
+        raise RuntimeError(f"template 放置失敗（root={root_xy}）")
+
+    grid = grid_cls(solver.width, solver.height)
+    placed = PlacedMap()
+    for nid in sorted(positions):
+        x, y = positions[nid]
+        grid.place(x, y, nid)
+        placed[nid] = Node(x=x, y=y, router_id=nid, core_id=-1)
+    grid.commit()
+    return placed, grid
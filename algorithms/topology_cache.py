@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from algorithms.area_partition import Block, grid_shape, build_blocks, partition_arrays
+from algorithms.level_dist import inter_layer_distances
+from algorithms.tree_index import TreeIndex
+
+
+# key 的第一個參數不是 num 的表：num 要加多少才會等於它（tree_index 用的是 num_nodes = num - 1）
+_NUM_KEY_OFFSET: Dict[str, int] = {"tree_index": -1}
+
+
+class TopologyCache:
+    """
+    同一個 num / leaf_area 算出來的拓樸表（grid_shape、inter_layer_distances、
+    area partition ...）共用一份的 LRU 快取。
+
+    - maxsize：最多存幾筆（所有種類合計），超過就丟最久沒用的
+    - 回傳的都是唯讀的東西（tuple / MappingProxyType / 唯讀 ndarray），
+      呼叫端改不到共用的狀態
+    - stats() 看每一種表的 hits / misses
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if maxsize < 1:
+            raise ValueError("maxsize 必須 >= 1")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, Hashable], Any]" = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._lock = Lock()
+
+    # ----- 快取本體 -----
+
+    def get(self, kind: str, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """kind 是表的種類（統計用），key 是參數；沒有就呼叫 builder 建一份"""
+        full_key = (kind, key)
+        with self._lock:
+            if full_key in self._data:
+                self._data.move_to_end(full_key)
+                self._hits[kind] = self._hits.get(kind, 0) + 1
+                return self._data[full_key]
+            self._misses[kind] = self._misses.get(kind, 0) + 1
+
+        value = builder()
+
+        with self._lock:
+            self._data[full_key] = value
+            self._data.move_to_end(full_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def invalidate(self, kind: Optional[str] = None, num: Optional[int] = None):
+        """
+        丟掉符合條件的項目：
+          - 都不給：全部清空
+          - 給 kind：只清這一種表
+          - 給 num：只清這個 num 的表（key 的第一個參數是 num；
+            tree_index 的是 num_nodes，所以清的是 num - 1 那份）
+        """
+        with self._lock:
+            for k in list(self._data.keys()):
+                k_kind, k_key = k
+                if kind is not None and k_kind != kind:
+                    continue
+                if num is not None:
+                    first = k_key[0] if isinstance(k_key, tuple) else k_key
+                    if first != num + _NUM_KEY_OFFSET.get(k_kind, 0):
+                        continue
+                del self._data[k]
+
+    def clear(self):
+        """清空資料跟統計"""
+        with self._lock:
+            self._data.clear()
+            self._hits.clear()
+            self._misses.clear()
+
+    def set_maxsize(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("maxsize 必須 >= 1")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """{kind: {"hits": .., "misses": ..}}，另外 "_total" 有 currsize / maxsize"""
+        with self._lock:
+            kinds = set(self._hits) | set(self._misses)
+            out = {
+                k: {"hits": self._hits.get(k, 0), "misses": self._misses.get(k, 0)}
+                for k in sorted(kinds)
+            }
+            out["_total"] = {
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "currsize": len(self._data),
+                "maxsize": self.maxsize,
+            }
+            return out
+
+    # ----- 各種拓樸表 -----
+
+    def grid_shape(self, num: int) -> Tuple[int, int]:
+        return self.get("grid_shape", num, lambda: grid_shape(num))
+
+    def inter_layer_distances(self, num: int) -> Tuple[int, Tuple[int, ...]]:
+        def build():
+            n, dists = inter_layer_distances(num)
+            return n, tuple(dists)
+        return self.get("inter_layer_distances", num, build)
+
+    def area_partition(self, num: int, leaf_area: int = 4) -> Mapping[int, Block]:
+        """node_id -> Block（唯讀）；要 Grid 的話自己用 grid_shape 建新的"""
+        def build():
+            return MappingProxyType(build_blocks(num, leaf_area=leaf_area))
+        return self.get("area_partition", (num, leaf_area), build)
+
+    def partition_arrays(
+        self,
+        num: int,
+        leaf_area: int = 4,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        def build():
+            arrays = partition_arrays(num, leaf_area)
+            for a in arrays:
+                a.setflags(write=False)
+            return arrays
+        return self.get("partition_arrays", (num, leaf_area), build)
+
+    def tree_index(self, num_nodes: int) -> TreeIndex:
+        """heap 樹 1..num_nodes 的 level / parent / children / 每層配對（陣列都是唯讀）"""
+        return self.get("tree_index", num_nodes, lambda: TreeIndex(num_nodes))
+
+
+# 預設共用的快取；批次跑很多設定時大家都用這一份
+topology_cache = TopologyCache()
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Tuple
+
+import numpy as np
+
+
+class TreeIndex:
+    """
+    heap 編號 1..num_nodes 的二元樹，全部事先算成 NumPy 陣列（index = node_id，index 0 不用）：
+      - level[i]  : 第幾層（root = 1）
+      - parent[i] : i // 2（root 的 parent = 0）
+      - left[i] / right[i] : 2i / 2i+1，超過 num_nodes 就是 -1
+    以及每一層的 (parent, child) 配對陣列。
+    同一個 num_nodes 建一次就好，請用 topology_cache.tree_index(num_nodes) 拿共用的。
+    """
+
+    def __init__(self, num_nodes: int):
+        if num_nodes < 1:
+            raise ValueError("num_nodes 必須 >= 1")
+        self.num_nodes = num_nodes
+        self.depth = num_nodes.bit_length()
+
+        ids = np.arange(num_nodes + 1, dtype=np.int64)
+
+        # 第 l 層有 2^(l-1) 個節點，直接 repeat，不用逐個算 log2
+        counts = [1 << (lvl - 1) for lvl in range(1, self.depth + 1)]
+        self.level = np.concatenate(([0], np.repeat(np.arange(1, self.depth + 1), counts)))
+        self.level = self.level[: num_nodes + 1]
+
+        self.parent = ids // 2
+        self.left = np.where(2 * ids <= num_nodes, 2 * ids, -1)
+        self.right = np.where(2 * ids + 1 <= num_nodes, 2 * ids + 1, -1)
+        self.left[0] = self.right[0] = -1
+
+        self._pairs: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for lvl in range(1, self.depth):
+            lo, hi = 1 << (lvl - 1), min(1 << lvl, num_nodes + 1)
+            parents = np.repeat(ids[lo:hi], 2)
+            children = 2 * parents + np.tile([0, 1], hi - lo)
+            keep = children <= num_nodes
+            if keep.any():
+                self._pairs[lvl] = (parents[keep], children[keep])
+
+        for a in (self.level, self.parent, self.left, self.right):
+            a.setflags(write=False)
+        for parents, children in self._pairs.values():
+            parents.setflags(write=False)
+            children.setflags(write=False)
+
+    def pairs(self, level: int) -> Tuple[np.ndarray, np.ndarray]:
+        """level -> level+1 的 (parents, children)；順序是 (p,2p), (p,2p+1), (p+1,...)"""
+        empty = np.empty(0, dtype=np.int64)
+        return self._pairs.get(level, (empty, empty))
+
+    def pairs_by_level(self) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        return dict(self._pairs)
+
+    def pair_lists_by_level(self) -> DefaultDict[int, List[Tuple[int, int]]]:
+        """跟 interconnect.parent_child_pairs_by_level 一樣的格式：level -> [(p, c), ...]"""
+        levels: DefaultDict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for lvl, (parents, children) in self._pairs.items():
+            levels[lvl] = list(zip(parents.tolist(), children.tolist()))
+        return levels
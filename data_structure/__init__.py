@@ -2,5 +2,12 @@ from .node_link import Node
 from .node_link import Link
 from .network import Network
 from .grid import Grid
+from .array_grid import ArrayGrid
+from .free_index import FreeCellIndex
+from .bitset_grid import BitsetGrid
+from .chunked_grid import ChunkedGrid
+from .placed_map import PlacedMap
+from .route import Route
+from .router_index import RouterIndex
 
-__all__ = ["Node", "Link", "Network", "Grid"]
+__all__ = ["Node", "Link", "Network", "Grid", "ArrayGrid", "FreeCellIndex", "BitsetGrid", "ChunkedGrid", "PlacedMap", "Route", "RouterIndex"]
@@ -0,0 +1,155 @@
+# array_grid.py
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from .grid import Grid
+from .free_index import FreeCellIndex
+
+
+def _fenwick_chains(size: int) -> Tuple[List[List[int]], List[List[int]]]:
+    """
+    up[k]  : 位置 k（0-based）更新時要改的 1-based index
+    down[k]: 前 k 個的前綴和要加的 1-based index
+    """
+    up = []
+    for k in range(size):
+        chain, i = [], k + 1
+        while i <= size:
+            chain.append(i)
+            i += i & -i
+        up.append(chain)
+    down = []
+    for k in range(size + 1):
+        chain, i = [], k
+        while i > 0:
+            chain.append(i)
+            i -= i & -i
+        down.append(chain)
+    return up, down
+
+
+class ArrayGrid(Grid):
+    """
+    用 NumPy 存的 Grid，介面跟 Grid 完全一樣（place / remove / get / is_used ...）。
+
+    - used[x, y]  : bool，連續記憶體的占用表（區域查詢可以直接向量化）
+    - cells[x, y] : 跟 used 平行的內容陣列（None 表示空），cells[x][y] 的寫法照舊可用
+    - 另外維護一個 FreeCellIndex，find_empty / find_empty_from 不用再整張掃
+    - 以及占用數的 2D Fenwick tree，place / remove 跟 free_count 都是 O(log W · log H)
+    """
+
+    def _init_storage(self):
+        width, height = self.width, self.height
+        self.used = np.zeros((width, height), dtype=bool)
+        self.cells = np.full((width, height), None, dtype=object)
+        self._free = FreeCellIndex(width * height)
+        # 占用數的 2D Fenwick tree（1-based），_occ[i][j] 管 lowbit(i) x lowbit(j) 的區塊
+        # （不用整張的 summed-area table：那個每次寫入要改 O(W·H) 格）
+        self._occ = [[0] * (height + 1) for _ in range(width + 1)]
+        # 每個座標要走的 Fenwick index 事先算好，熱路徑只剩兩層 for
+        self._up_x, self._down_x = _fenwick_chains(width)
+        self._up_y, self._down_y = _fenwick_chains(height)
+
+    # ----- 儲存層 -----
+
+    def _is_used_at(self, x: int, y: int) -> bool:
+        return bool(self.used[x, y])
+
+    def _get_at(self, x: int, y: int) -> Any:
+        return self.cells[x, y]
+
+    def _set_at(self, x: int, y: int, value: Any):
+        if value is None:
+            self._clear_at(x, y)
+            return
+        if not self.used[x, y]:
+            self.used[x, y] = True
+            self._free.mark_used(x * self.height + y)
+            self._occ_add(x, y, 1)
+        self.cells[x, y] = value
+
+    def _clear_at(self, x: int, y: int):
+        if self.used[x, y]:
+            self.used[x, y] = False
+            self._free.mark_free(x * self.height + y)
+            self._occ_add(x, y, -1)
+        self.cells[x, y] = None
+
+    # ----- 占用數的 2D Fenwick tree -----
+
+    def _occ_add(self, x: int, y: int, delta: int):
+        occ = self._occ
+        up_y = self._up_y[y]
+        for i in self._up_x[x]:
+            row = occ[i]
+            for j in up_y:
+                row[j] += delta
+
+    def _occ_prefix(self, x: int, y: int) -> int:
+        """used[0:x, 0:y] 的占用數"""
+        occ = self._occ
+        down_y = self._down_y[y]
+        total = 0
+        for i in self._down_x[x]:
+            row = occ[i]
+            for j in down_y:
+                total += row[j]
+        return total
+
+    # ----- 找空位 -----
+
+    def _to_xy(self, i: Optional[int]) -> Optional[Tuple[int, int]]:
+        if i is None:
+            return None
+        return divmod(i, self.height)
+
+    def find_empty(self) -> Optional[Tuple[int, int]]:
+        """從 (0,0) 開始掃描，找到第一個空格（O(log n)）"""
+        return self._to_xy(self._free.first_free_from(0))
+
+    def find_empty_from(self, start_x: int, start_y: int) -> Optional[Tuple[int, int]]:
+        """跟 Grid.find_empty_from 一樣的順序，但用空格索引直接跳過去"""
+        self._check_bounds(start_x, start_y)
+        return self._to_xy(self._free.first_free_from(start_x * self.height + start_y))
+
+    @property
+    def free_total(self) -> int:
+        """整張 grid 還有幾個空格"""
+        return self._free.free
+
+    # ----- 區域查詢（範圍含邊界，跟 Block 的 x0..x1 / y0..y1 一樣） -----
+
+    def region_used(self, x0: int, x1: int, y0: int, y1: int) -> np.ndarray:
+        """回傳區域內的占用表（唯讀 view）"""
+        self._check_bounds(x0, y0)
+        self._check_bounds(x1, y1)
+        view = self.used[x0:x1 + 1, y0:y1 + 1]
+        view.flags.writeable = False
+        return view
+
+    def free_count(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        """區域內有幾個空格，查 Fenwick tree，O(log W · log H)"""
+        self._check_bounds(x0, y0)
+        self._check_bounds(x1, y1)
+        prefix = self._occ_prefix
+        used = prefix(x1 + 1, y1 + 1) - prefix(x0, y1 + 1) - prefix(x1 + 1, y0) + prefix(x0, y0)
+        return (x1 - x0 + 1) * (y1 - y0 + 1) - used
+
+    def count_free_in(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        """同 free_count"""
+        return self.free_count(x0, x1, y0, y1)
+
+    def free_cells_in(self, x0: int, x1: int, y0: int, y1: int) -> np.ndarray:
+        """
+        區域內所有空格座標，shape = (k, 2)，每列是 (x, y)。
+        順序跟逐格掃描一樣（先 x 再 y）。
+        """
+        region = self.region_used(x0, x1, y0, y1)
+        return np.argwhere(~region) + (x0, y0)
+
+    # ----- 方便 debug 的文字輸出 -----
+
+    def __str__(self) -> str:
+        rows = np.where(self.used.T[::-1], "1", "0")
+        return "\n".join(" ".join(row) for row in rows)
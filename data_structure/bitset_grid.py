@@ -0,0 +1,125 @@
+# bitset_grid.py
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .grid import Grid
+
+
+class BitsetGrid(Grid):
+    """
+    用 bitset 存占用狀態的 Grid（介面跟 Grid 一樣）。
+
+    每一欄 (column) 是一段 height 個 bit，整張 grid 就是所有欄位接起來的一個
+    Python 大整數：bit i = x * height + y，跟 find_empty 的掃描順序相同。
+
+    另外快取兩種 mask：
+      - block mask : 矩形區塊 x0..x1, y0..y1 內的所有格子
+      - ring mask  : 跟 (px,py) 的曼哈頓距離剛好 = d 的所有格子
+    於是某個區塊的候選位置就是 ring & block & ~occupied，幾次整數運算就好。
+    """
+
+    def __init__(self, width: int, height: int, mask_cache_size: int = 4096):
+        super().__init__(width, height)
+        self._block_mask = lru_cache(maxsize=mask_cache_size)(self._build_block_mask)
+        self._ring_mask = lru_cache(maxsize=mask_cache_size)(self._build_ring_mask)
+
+    def _init_storage(self):
+        self.occupied = 0
+        self.values: Dict[Tuple[int, int], Any] = {}
+        self._full = (1 << (self.width * self.height)) - 1
+
+    def _bit(self, x: int, y: int) -> int:
+        return 1 << (x * self.height + y)
+
+    # ----- 儲存層 -----
+
+    def _is_used_at(self, x: int, y: int) -> bool:
+        return (self.occupied >> (x * self.height + y)) & 1 == 1
+
+    def _get_at(self, x: int, y: int) -> Any:
+        return self.values.get((x, y))
+
+    def _set_at(self, x: int, y: int, value: Any):
+        if value is None:
+            self._clear_at(x, y)
+            return
+        self.occupied |= self._bit(x, y)
+        self.values[(x, y)] = value
+
+    def _clear_at(self, x: int, y: int):
+        self.occupied &= ~self._bit(x, y)
+        self.values.pop((x, y), None)
+
+    # ----- mask -----
+
+    def _build_block_mask(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        col = ((1 << (y1 - y0 + 1)) - 1) << y0
+        mask = 0
+        for x in range(x0, x1 + 1):
+            mask |= col << (x * self.height)
+        return mask
+
+    def _build_ring_mask(self, px: int, py: int, d: int) -> int:
+        mask = 0
+        for dx in range(-d, d + 1):
+            x = px + dx
+            if not 0 <= x < self.width:
+                continue
+            r = d - abs(dx)
+            for y in {py - r, py + r}:
+                if 0 <= y < self.height:
+                    mask |= self._bit(x, y)
+        return mask
+
+    def block_mask(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        """矩形區塊（含邊界）的 mask"""
+        self._check_bounds(x0, y0)
+        self._check_bounds(x1, y1)
+        return self._block_mask(x0, x1, y0, y1)
+
+    def ring_mask(self, px: int, py: int, d: int) -> int:
+        """曼哈頓距離 == d from (px,py) 的 mask（已裁掉 grid 外的部分）"""
+        return self._ring_mask(px, py, d)
+
+    def iter_bits(self, mask: int):
+        """依 bit 由小到大（= 先 x 再 y）吐出 (x, y)"""
+        while mask:
+            low = mask & -mask
+            yield divmod(low.bit_length() - 1, self.height)
+            mask ^= low
+
+    def candidates(
+        self,
+        x0: int,
+        x1: int,
+        y0: int,
+        y1: int,
+        parent_xy: Tuple[int, int],
+        dist: int,
+    ) -> List[Tuple[int, int]]:
+        """
+        區塊內、還沒被占用、且跟 parent 距離剛好 = dist 的格子。
+        順序跟逐格掃描區塊一樣，所以 DFS 的結果不會變。
+        """
+        px, py = parent_xy
+        mask = self._ring_mask(px, py, dist) & self.block_mask(x0, x1, y0, y1) & ~self.occupied
+        return list(self.iter_bits(mask))
+
+    def free_count(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        """區域內有幾個空格（popcount）"""
+        return (self.block_mask(x0, x1, y0, y1) & ~self.occupied).bit_count()
+
+    # ----- 找空位 -----
+
+    def _first_free_bit_from(self, i: int) -> Optional[Tuple[int, int]]:
+        free = (~self.occupied & self._full) >> i
+        if free == 0:
+            return None
+        return divmod((free & -free).bit_length() - 1 + i, self.height)
+
+    def find_empty(self) -> Optional[Tuple[int, int]]:
+        return self._first_free_bit_from(0)
+
+    def find_empty_from(self, start_x: int, start_y: int) -> Optional[Tuple[int, int]]:
+        self._check_bounds(start_x, start_y)
+        return self._first_free_bit_from(start_x * self.height + start_y)
@@ -0,0 +1,198 @@
+# chunked_grid.py
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .grid import Grid
+
+
+class ChunkedGrid(Grid):
+    """
+    切成 tile x tile 小塊、用到才配置的 Grid（介面跟 Grid 一樣）。
+
+    - 只存非負整數（例如 router_id）；格子內部存 value + 1，0 表示空格，
+      所以沒碰過的 tile 根本不用配置。
+    - 給 path 時整張 grid 放在記憶體映射的 .npy 檔裡（作業系統用到才讀），
+      之後可以用 ChunkedGrid.open(path) 重新打開查詢，不必整張讀進 RAM。
+    """
+
+    def __init__(self, width: int, height: int, tile: int = 64, path: Optional[str] = None):
+        if tile <= 0:
+            raise ValueError("tile 必須 > 0")
+        self.tile = tile
+        self.path = path
+        self._mmap: Optional[np.ndarray] = None
+        super().__init__(width, height)
+
+    def _init_storage(self):
+        # (tx, ty) -> 該 tile 的陣列；記憶體模式下 tile 清空就釋放
+        self._tiles: Dict[Tuple[int, int], np.ndarray] = {}
+        # (tx, ty) -> 該 tile 的占用格數
+        self._tile_used: Dict[Tuple[int, int], int] = {}
+        if self.path is not None and self._mmap is None:
+            self._mmap = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=np.int32, shape=(self.width, self.height)
+            )
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r", tile: int = 64) -> "ChunkedGrid":
+        """
+        打開 save() / path 模式存下來的 grid。
+        mode='r' 唯讀、'r+' 可以繼續修改（直接寫回檔案）。
+        """
+        data = np.load(path, mmap_mode=mode)
+        if data.ndim != 2 or data.dtype != np.int32:
+            raise ValueError(f"{path} 不是 ChunkedGrid 存的檔案")
+        grid = cls.__new__(cls)
+        grid.tile = tile
+        grid.path = path
+        grid._mmap = data
+        Grid.__init__(grid, data.shape[0], data.shape[1])
+        return grid
+
+    def save(self, path: str):
+        """存成 .npy（只寫有配置的 tile，其餘部分在檔案系統上是 sparse）"""
+        if self._mmap is not None and path == self.path:
+            self.flush()
+            return
+        out = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.int32, shape=(self.width, self.height)
+        )
+        for (tx, ty) in self._allocated_tiles():
+            tile = self._tile(tx, ty, create=False)
+            x0, y0 = tx * self.tile, ty * self.tile
+            out[x0:x0 + tile.shape[0], y0:y0 + tile.shape[1]] = tile
+        out.flush()
+        del out
+
+    def flush(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    # ----- tile 管理 -----
+
+    def _tile_shape(self, tx: int, ty: int) -> Tuple[int, int]:
+        x0, y0 = tx * self.tile, ty * self.tile
+        return min(self.tile, self.width - x0), min(self.tile, self.height - y0)
+
+    def _allocated_tiles(self):
+        if self._mmap is None:
+            return list(self._tiles.keys())
+        nx = -(-self.width // self.tile)
+        ny = -(-self.height // self.tile)
+        return [(tx, ty) for tx in range(nx) for ty in range(ny)]
+
+    def _tile(self, tx: int, ty: int, create: bool) -> Optional[np.ndarray]:
+        key = (tx, ty)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile
+
+        if self._mmap is not None:
+            x0, y0 = tx * self.tile, ty * self.tile
+            w, h = self._tile_shape(tx, ty)
+            tile = self._mmap[x0:x0 + w, y0:y0 + h]
+            self._tiles[key] = tile
+            self._tile_used[key] = int(np.count_nonzero(tile))
+            return tile
+
+        if not create:
+            return None
+        tile = np.zeros(self._tile_shape(tx, ty), dtype=np.int32)
+        self._tiles[key] = tile
+        self._tile_used[key] = 0
+        return tile
+
+    def _used_in_tile(self, tx: int, ty: int) -> int:
+        if self._tile(tx, ty, create=False) is None:
+            return 0
+        return self._tile_used[(tx, ty)]
+
+    @property
+    def allocated_bytes(self) -> int:
+        """目前在記憶體裡配置的 tile 大小（mmap 模式下是已經映射的部分）"""
+        return sum(t.nbytes for t in self._tiles.values())
+
+    # ----- 儲存層 -----
+
+    def _is_used_at(self, x: int, y: int) -> bool:
+        tile = self._tile(x // self.tile, y // self.tile, create=False)
+        return tile is not None and tile[x % self.tile, y % self.tile] != 0
+
+    def _get_at(self, x: int, y: int) -> Any:
+        tile = self._tile(x // self.tile, y // self.tile, create=False)
+        if tile is None:
+            return None
+        v = int(tile[x % self.tile, y % self.tile])
+        return None if v == 0 else v - 1
+
+    def _set_at(self, x: int, y: int, value: Any):
+        if value is None:
+            self._clear_at(x, y)
+            return
+        if not isinstance(value, (int, np.integer)) or not 0 <= value < np.iinfo(np.int32).max:
+            raise TypeError(f"ChunkedGrid 只能存非負整數（例如 router_id），收到 {value!r}")
+        key = (x // self.tile, y // self.tile)
+        tile = self._tile(*key, create=True)
+        lx, ly = x % self.tile, y % self.tile
+        if tile[lx, ly] == 0:
+            self._tile_used[key] += 1
+        tile[lx, ly] = value + 1
+
+    def _clear_at(self, x: int, y: int):
+        key = (x // self.tile, y // self.tile)
+        tile = self._tile(*key, create=False)
+        if tile is None:
+            return
+        lx, ly = x % self.tile, y % self.tile
+        if tile[lx, ly] == 0:
+            return
+        tile[lx, ly] = 0
+        self._tile_used[key] -= 1
+        if self._tile_used[key] == 0 and self._mmap is None:
+            del self._tiles[key]
+            del self._tile_used[key]
+
+    # ----- 區域統計 -----
+
+    def free_count(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        """逐 tile 統計；沒配置的 tile 整塊都是空的"""
+        self._check_bounds(x0, y0)
+        self._check_bounds(x1, y1)
+        T = self.tile
+        free = (x1 - x0 + 1) * (y1 - y0 + 1)
+        for tx in range(x0 // T, x1 // T + 1):
+            for ty in range(y0 // T, y1 // T + 1):
+                if self._used_in_tile(tx, ty) == 0:
+                    continue
+                tile = self._tiles[(tx, ty)]
+                ax0, ax1 = max(x0, tx * T) - tx * T, min(x1, tx * T + T - 1) - tx * T
+                ay0, ay1 = max(y0, ty * T) - ty * T, min(y1, ty * T + T - 1) - ty * T
+                free -= int(np.count_nonzero(tile[ax0:ax1 + 1, ay0:ay1 + 1]))
+        return free
+
+    # ----- 找空位 -----
+
+    def find_empty(self) -> Optional[Tuple[int, int]]:
+        return self.find_empty_from(0, 0)
+
+    def find_empty_from(self, start_x: int, start_y: int) -> Optional[Tuple[int, int]]:
+        """跟 Grid.find_empty_from 一樣的順序；空 tile 直接命中、滿 tile 直接跳過"""
+        self._check_bounds(start_x, start_y)
+        T = self.tile
+        for x in range(start_x, self.width):
+            tx, lx = divmod(x, T)
+            y = start_y if x == start_x else 0
+            while y < self.height:
+                ty = y // T
+                used = self._used_in_tile(tx, ty)
+                if used == 0:
+                    return x, y
+                w, h = self._tile_shape(tx, ty)
+                if used < w * h:
+                    col = self._tiles[(tx, ty)][lx, y - ty * T:]
+                    hit = np.flatnonzero(col == 0)
+                    if hit.size:
+                        return x, y + int(hit[0])
+                y = (ty + 1) * T
+        return None
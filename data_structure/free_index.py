@@ -0,0 +1,65 @@
+# free_index.py
+from typing import Optional
+
+
+class FreeCellIndex:
+    """
+    空格索引（Fenwick tree / BIT）。
+
+    把 grid 攤平成一維：i = x * height + y，跟 find_empty 的掃描順序一樣
+    （先 x 再 y）。每個位置存 1=空、0=占用，於是：
+      - 標記占用 / 釋放：O(log n)
+      - 「i 之後第一個空格」：O(log n)
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.free = size
+        # 全部都是 1 時，tree[i] 剛好等於 i 的 lowbit
+        self._tree = [i & -i for i in range(size + 1)]
+        self._top = 1 << size.bit_length() if size > 0 else 0
+
+    def _add(self, i: int, delta: int):
+        i += 1
+        tree = self._tree
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def mark_used(self, i: int):
+        """位置 i 由空變成占用（呼叫端保證原本是空的）"""
+        self._add(i, -1)
+        self.free -= 1
+
+    def mark_free(self, i: int):
+        """位置 i 由占用變成空（呼叫端保證原本是占用的）"""
+        self._add(i, 1)
+        self.free += 1
+
+    def count_before(self, i: int) -> int:
+        """[0, i) 之間有幾個空格"""
+        s = 0
+        tree = self._tree
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    def kth_free(self, k: int) -> Optional[int]:
+        """第 k 個空格（k 從 1 開始）的位置；不夠 k 個就回 None"""
+        if k < 1 or k > self.free:
+            return None
+        pos = 0
+        tree = self._tree
+        step = self._top
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and tree[nxt] < k:
+                pos = nxt
+                k -= tree[nxt]
+            step >>= 1
+        return pos  # pos 是 1-based 的前一格，剛好等於 0-based 的答案
+
+    def first_free_from(self, i: int) -> Optional[int]:
+        """位置 >= i 的第一個空格"""
+        return self.kth_free(self.count_before(i) + 1)
@@ -1,18 +1,32 @@
 # grid.py
-from typing import Any, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
 class Grid:
     """
     X x Y 的方格，用來做 router / core 位置擺放。
     每一格可以放一個任意物件（例如 router_id、Node 物件等）。
+
+    有 mark 還沒結束的時候，place / remove 都會記在 undo trail 上：
+        m = grid.mark()
+        ...（放一堆東西）
+        grid.rollback(m)   # 一次回到 mark 當時的狀態
+    沒有 mark 時不記（長時間留著的 grid 一直改也不會越記越多）；
+    mark 要嘛 rollback、要嘛最後 commit() 一起結束。
     """
 
     def __init__(self, width: int, height: int):
         self.width = width
         self.height = height
 
+        # trail 每筆是 (x, y, 修改前的內容)
+        self._trail: List[Tuple[int, int, Any]] = []
+        # 還沒 rollback / commit 的 mark 數；0 的時候不記 trail
+        self._marks = 0
+        self._init_storage()
+
+    def _init_storage(self):
         # cells[x][y] = None 表示沒有人用；否則存放占用這格的物件
-        self.cells = [[None for _ in range(height)] for _ in range(width)]
+        self.cells = [[None for _ in range(self.height)] for _ in range(self.width)]
 
     # ----- 基本操作 -----
 
@@ -26,25 +40,92 @@ class Grid:
     def is_used(self, x: int, y: int) -> bool:
         """這格有沒有被占用"""
         self._check_bounds(x, y)
-        return self.cells[x][y] is not None
+        return self._is_used_at(x, y)
 
     def get(self, x: int, y: int) -> Any:
         """取得這格目前的內容 (None / router_id / 物件）"""
         self._check_bounds(x, y)
-        return self.cells[x][y]
+        return self._get_at(x, y)
 
     def place(self, x: int, y: int, value: Any):
         """在 (x,y) 放一個東西（例如 router_id) """
         self._check_bounds(x, y)
-        if self.is_used(x, y):
+        if self._is_used_at(x, y):
             raise ValueError(f"格子 ({x}, {y}) 已被使用，不能再放")
-        self.cells[x][y] = value
+        self.place_unchecked(x, y, value)
 
     def remove(self, x: int, y: int):
         """把 (x,y) 清空"""
         self._check_bounds(x, y)
+        self.remove_unchecked(x, y)
+
+    # ----- 熱路徑：呼叫端自己保證在範圍內、且 place 時格子是空的 -----
+
+    def is_used_unchecked(self, x: int, y: int) -> bool:
+        return self._is_used_at(x, y)
+
+    def place_unchecked(self, x: int, y: int, value: Any):
+        if self._marks:
+            self._trail.append((x, y, None))
+        self._set_at(x, y, value)
+
+    def remove_unchecked(self, x: int, y: int):
+        if self._marks:
+            self._trail.append((x, y, self._get_at(x, y)))
+        self._clear_at(x, y)
+
+    # ----- undo trail -----
+
+    def mark(self) -> int:
+        """目前的 checkpoint；從這裡開始記 trail"""
+        self._marks += 1
+        return len(self._trail)
+
+    def rollback(self, mark: int):
+        """把 mark 之後的所有 place / remove 全部復原，這個 mark 就結束了"""
+        trail = self._trail
+        while len(trail) > mark:
+            x, y, prev = trail.pop()
+            if prev is None:
+                self._clear_at(x, y)
+            else:
+                self._set_at(x, y, prev)
+        self._marks = max(self._marks - 1, 0)
+        if not self._marks:
+            trail.clear()
+
+    def commit(self):
+        """丟掉 trail、結束所有 mark（之後就不能 rollback 到更早的 mark）"""
+        self._trail.clear()
+        self._marks = 0
+
+    # ----- 儲存層（不檢查邊界；換 backend 時只要覆寫這四個） -----
+
+    def _is_used_at(self, x: int, y: int) -> bool:
+        return self.cells[x][y] is not None
+
+    def _get_at(self, x: int, y: int) -> Any:
+        return self.cells[x][y]
+
+    def _set_at(self, x: int, y: int, value: Any):
+        self.cells[x][y] = value
+
+    def _clear_at(self, x: int, y: int):
         self.cells[x][y] = None
 
+    # ----- 區域統計 -----
+
+    def free_count(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        """矩形區域（含邊界）內有幾個空格；這裡逐格數，ArrayGrid 查 Fenwick tree"""
+        self._check_bounds(x0, y0)
+        self._check_bounds(x1, y1)
+        return sum(
+            1
+            for x in range(x0, x1 + 1)
+            for y in range(y0, y1 + 1)
+            if not self._is_used_at(x, y)
+        )
+
     # ----- 找空位 -----
 
     def find_empty(self) -> Optional[Tuple[int, int]]:
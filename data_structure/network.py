@@ -1,23 +1,178 @@
 from .node_link import Node
 from .node_link import Link
-from typing import List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 重複的邊怎麼處理
+#   None         : 不檢查，照舊每次 add_link 都加一條（預設，跟以前一樣）
+#   "undirected" : (u, v) 跟 (v, u) 算同一條
+#   "directed"   : 同方向的才算重複
+DEDUP_POLICIES = (None, "undirected", "directed")
+
+# add_link / add_links 沒指定 dedup 時用 network 自己的設定
+_DEFAULT = object()
+
 
 class Network:
-    def __init__(self, width, height):
+    """
+    nodes / links 兩個 list 照舊（visualize 直接讀），另外維護：
+      - router_id -> Node 的索引（node(rid)）
+      - 每個 router 的出 / 入鄰居（neighbors(rid)）
+      - (u, v) -> Link 的邊表，has_link / get_link 都是 O(1)
+    dedup 有設的話，add_link / add_links 遇到已經有的邊就不再加。
+    """
+
+    def __init__(self, width, height, dedup: Optional[str] = None):
+        if dedup not in DEDUP_POLICIES:
+            raise ValueError(f"dedup 必須是 {DEDUP_POLICIES} 其中之一")
         self.nodes: List[Node] = []
         self.links: List[Link] = []
         self.width = width
         self.height = height
+        self.dedup = dedup
+
+        self._by_router: Dict[int, Node] = {}
+        self._out: Dict[int, List[int]] = {}
+        self._in: Dict[int, List[int]] = {}
+        # 有向的 (u, v) -> 第一條 u -> v 的 Link
+        self._edges: Dict[Tuple[int, int], Link] = {}
 
     def add_node(self, x: int, y: int, router_id: int, core_id: int) -> Node:
         node = Node(x, y, router_id, core_id)
-        self.nodes.append(node)
+        self.add_existing_node(node)
         return node
-    
+
     def add_existing_node(self, node: Node):
         self.nodes.append(node)
+        if node.router_id is not None:
+            self._by_router[node.router_id] = node
 
-    def add_link(self, node_u: Node, node_v: Node, bandwidth: float, color = "black") -> Link:
-        link = Link(node_u, node_v, bandwidth, color)
+    # ----- 查詢 -----
+
+    def node(self, router_id: int) -> Optional[Node]:
+        """router_id -> Node，沒有就 None"""
+        return self._by_router.get(router_id)
+
+    def has_link(self, u: int, v: int, directed: bool = False) -> bool:
+        """router u、v 之間有沒有邊；directed=False 時兩個方向都算"""
+        if (u, v) in self._edges:
+            return True
+        return not directed and (v, u) in self._edges
+
+    def get_link(self, u: int, v: int, directed: bool = False) -> Optional[Link]:
+        link = self._edges.get((u, v))
+        if link is None and not directed:
+            link = self._edges.get((v, u))
+        return link
+
+    def neighbors(self, router_id: int, direction: str = "both") -> List[int]:
+        """
+        相鄰的 router_id（照加進來的順序，不重複）
+        direction："out"（router_id -> v）、"in"（u -> router_id）或 "both"
+        """
+        if direction == "out":
+            return list(dict.fromkeys(self._out.get(router_id, ())))
+        if direction == "in":
+            return list(dict.fromkeys(self._in.get(router_id, ())))
+        if direction == "both":
+            return list(dict.fromkeys(self._out.get(router_id, []) + self._in.get(router_id, [])))
+        raise ValueError("direction 必須是 'out'、'in' 或 'both'")
+
+    def degree(self, router_id: int) -> int:
+        return len(self.neighbors(router_id))
+
+    # ----- 加邊 -----
+
+    def _is_duplicate(self, u: int, v: int, dedup: Optional[str]) -> bool:
+        if dedup is None:
+            return False
+        return self.has_link(u, v, directed=dedup == "directed")
+
+    def _append_link(self, link: Link, u: int, v: int):
         self.links.append(link)
-        return link
\ No newline at end of file
+        self._edges.setdefault((u, v), link)
+        self._out.setdefault(u, []).append(v)
+        self._in.setdefault(v, []).append(u)
+
+    def add_link(
+        self,
+        node_u: Node,
+        node_v: Node,
+        bandwidth: float,
+        color = "black",
+        dedup: Optional[str] = _DEFAULT,
+    ) -> Optional[Link]:
+        """
+        加一條 node_u -> node_v 的邊，回傳新的 Link。
+        dedup 沒給就用 network 的設定；已經有這條邊的話不加，回傳 None（原本那條用 get_link 拿）。
+        端點還不在 network 裡的話照 add_existing_node 一起加進 nodes。
+        """
+        if dedup is _DEFAULT:
+            dedup = self.dedup
+        elif dedup not in DEDUP_POLICIES:
+            raise ValueError(f"dedup 必須是 {DEDUP_POLICIES} 其中之一")
+        u, v = node_u.router_id, node_v.router_id
+        if self._is_duplicate(u, v, dedup):
+            return None
+        for n in (node_u, node_v):
+            if n.router_id is not None and n.router_id not in self._by_router:
+                self.add_existing_node(n)
+        link = Link(node_u, node_v, bandwidth, color)
+        self._append_link(link, u, v)
+        return link
+
+    def add_links(
+        self,
+        u_routers: Union[Sequence[int], np.ndarray],
+        v_routers: Union[Sequence[int], np.ndarray],
+        bandwidth: Union[float, Sequence[float], np.ndarray] = 1.0,
+        color: str = "black",
+        dedup: Optional[str] = _DEFAULT,
+    ) -> List[Tuple[int, int]]:
+        """
+        一次加很多條邊：u_routers[i] -> v_routers[i]（router_id 陣列，例如 RoutingTable / route_batch 算出來的）。
+        bandwidth 可以是一個數或跟邊一樣長的陣列。
+        router 要先用 add_node / add_existing_node 加進來，找不到的直接跳過。
+        回傳真的加進去的 [(u, v), ...]。
+        """
+        if dedup is _DEFAULT:
+            dedup = self.dedup
+        elif dedup not in DEDUP_POLICIES:
+            raise ValueError(f"dedup 必須是 {DEDUP_POLICIES} 其中之一")
+        u_arr = np.asarray(u_routers, dtype=np.int64).ravel()
+        v_arr = np.asarray(v_routers, dtype=np.int64).ravel()
+        if len(u_arr) != len(v_arr):
+            raise ValueError("u_routers 和 v_routers 的數量必須一樣")
+        bw_arr = None
+        if np.ndim(bandwidth) != 0:
+            bw_arr = np.asarray(bandwidth).ravel()
+            if len(bw_arr) != len(u_arr):
+                raise ValueError("bandwidth 陣列的長度必須跟邊數一樣")
+
+        if dedup is not None and len(u_arr):
+            # 這一批裡自己重複的先用 NumPy 拿掉（留第一次出現的），迴圈只要再比 network 裡已有的邊
+            a, b = u_arr, v_arr
+            if dedup == "undirected":
+                a, b = np.minimum(u_arr, v_arr), np.maximum(u_arr, v_arr)
+            _, first = np.unique(np.stack([a, b], axis=1), axis=0, return_index=True)
+            first.sort()
+            u_arr, v_arr = u_arr[first], v_arr[first]
+            if bw_arr is not None:
+                bw_arr = bw_arr[first]
+
+        us, vs = u_arr.tolist(), v_arr.tolist()
+        bws: Iterable[float] = [bandwidth] * len(us) if bw_arr is None else bw_arr.tolist()
+
+        by_router = self._by_router
+        added: List[Tuple[int, int]] = []
+        for u, v, bw in zip(us, vs, bws):
+            node_u = by_router.get(u)
+            node_v = by_router.get(v)
+            if node_u is None or node_v is None:
+                continue
+            if self._is_duplicate(u, v, dedup):
+                continue
+            self._append_link(Link(node_u, node_v, bw, color), u, v)
+            added.append((u, v))
+        return added
@@ -0,0 +1,52 @@
+# placed_map.py
+from typing import Any, List, Tuple
+
+from .node_link import Node
+
+_MISSING = object()
+
+
+class PlacedMap(dict):
+    """
+    node_id -> Node 的 dict，多了跟 Grid 一樣的 undo trail：
+        m = placed.mark()
+        placed.assign(nid, node)
+        placed.rollback(m)
+    跟 Grid 一樣，只有 mark 還沒 rollback / commit 的時候才記 trail。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # trail 每筆是 (node_id, 修改前的 Node 或 _MISSING)
+        self._trail: List[Tuple[int, Any]] = []
+        self._marks = 0
+
+    def assign(self, node_id: int, node: Node):
+        if self._marks:
+            self._trail.append((node_id, self.get(node_id, _MISSING)))
+        self[node_id] = node
+
+    def unassign(self, node_id: int):
+        prev = self.pop(node_id)
+        if self._marks:
+            self._trail.append((node_id, prev))
+
+    def mark(self) -> int:
+        self._marks += 1
+        return len(self._trail)
+
+    def rollback(self, mark: int):
+        trail = self._trail
+        while len(trail) > mark:
+            node_id, prev = trail.pop()
+            if prev is _MISSING:
+                del self[node_id]
+            else:
+                self[node_id] = prev
+        self._marks = max(self._marks - 1, 0)
+        if not self._marks:
+            trail.clear()
+
+    def commit(self):
+        self._trail.clear()
+        self._marks = 0
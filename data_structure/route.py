@@ -0,0 +1,142 @@
+# route.py
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+XY = Tuple[int, int]
+
+_FIELDS = ("parent", "child", "src_router", "dst_router", "XY", "YX")
+
+
+def _step(a: int, b: int) -> int:
+    return 1 if b > a else -1
+
+
+class Route:
+    """
+    一個 (parent, child) 配對的路徑，只存端點，hop 要用的時候才展開。
+
+    - hops(order)    : 逐格產生座標（order = "XY" 先走 X、"YX" 先走 Y）
+    - routers(order) : 逐格產生 router_id（用建立時給的 lookup 把座標轉成 router）
+    - is_unique      : XY 跟 YX 是同一條（起終點同一列或同一行），O(1)
+    - turn(order)    : 轉彎的那一格（直線的話就是終點）
+
+    也可以當舊的 dict 用：route["XY"]、route.get("YX", [])、route["src_router"] ...
+    """
+
+    __slots__ = ("parent", "child", "src_router", "dst_router", "src", "dst", "order", "_lookup")
+
+    def __init__(
+        self,
+        parent: int,
+        child: int,
+        src_router: int,
+        dst_router: int,
+        src: XY,
+        dst: XY,
+        order: str = "XY",
+        lookup: Optional[Callable[[XY], int]] = None,
+    ):
+        if order not in ("XY", "YX"):
+            raise ValueError("order 必須是 'XY' 或 'YX'")
+        self.parent = parent
+        self.child = child
+        self.src_router = src_router
+        self.dst_router = dst_router
+        self.src = src
+        self.dst = dst
+        self.order = order
+        self._lookup = lookup
+
+    # ----- 路徑 -----
+
+    @property
+    def is_unique(self) -> bool:
+        return self.src[0] == self.dst[0] or self.src[1] == self.dst[1]
+
+    @property
+    def length(self) -> int:
+        """經過幾格（含起點和終點）"""
+        return abs(self.dst[0] - self.src[0]) + abs(self.dst[1] - self.src[1]) + 1
+
+    def turn(self, order: Optional[str] = None) -> XY:
+        order = order or self.order
+        if order == "XY":
+            return (self.dst[0], self.src[1])
+        return (self.src[0], self.dst[1])
+
+    def hops(self, order: Optional[str] = None) -> Iterator[XY]:
+        order = order or self.order
+        (sx, sy), (dx, dy) = self.src, self.dst
+        x, y = sx, sy
+        yield x, y
+        if order == "XY":
+            while x != dx:
+                x += _step(x, dx)
+                yield x, y
+            while y != dy:
+                y += _step(y, dy)
+                yield x, y
+        else:
+            while y != dy:
+                y += _step(y, dy)
+                yield x, y
+            while x != dx:
+                x += _step(x, dx)
+                yield x, y
+
+    def routers(self, order: Optional[str] = None) -> Iterator[int]:
+        if self._lookup is None:
+            raise ValueError("這個 Route 沒有座標 -> router 的 lookup")
+        lookup = self._lookup
+        if hasattr(lookup, "translate"):
+            # RouterIndex：整條一次轉
+            yield from lookup.translate(self.hops(order))
+            return
+        for xy in self.hops(order):
+            yield lookup(xy)
+
+    def links(self, order: Optional[str] = None) -> Iterator[Tuple[int, int]]:
+        """路徑上相鄰兩個 router 組成的邊 (u, v)"""
+        prev = None
+        for r in self.routers(order):
+            if prev is not None:
+                yield prev, r
+            prev = r
+
+    # ----- 舊的 dict 介面 -----
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("XY", "YX"):
+            return list(self.routers(key))
+        if key in _FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FIELDS
+
+    def keys(self):
+        return _FIELDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in _FIELDS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Route):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"Route({self.parent}->{self.child}, {self.src}->{self.dst}, "
+            f"routers {self.src_router}->{self.dst_router}, {self.order})"
+        )
@@ -0,0 +1,192 @@
+# router_index.py
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .node_link import Node
+
+XY = Tuple[int, int]
+
+# 沒有 router 的格子在 cell_router 裡的值
+NO_ROUTER = -1
+
+# 路徑經過沒有 router 的格子（或超出 grid）時怎麼處理
+#   "raise": ValueError（跟原本 coord_to_router_id 一樣）
+#   "skip" : 那一格直接丟掉
+#   "keep" : 那一格填 NO_ROUTER
+MISSING_POLICIES = ("raise", "skip", "keep")
+
+
+class RouterIndex:
+    """
+    placement 的空間索引，建一次之後查詢都是 O(1)：
+      - cell_router[x, y] : 那一格的 router_id（沒有就是 NO_ROUTER），int32 的 W x H 陣列
+      - router_xy[r]      : router r 的 (x, y)（沒有就是 (-1, -1)）
+      - node_of(r)        : router r 的 Node
+
+    translate / translate_array / translate_batch 把整條座標路徑一次轉成 router_id，
+    routing_algorithms.route_batch 的 CSR 輸出可以直接丟進 translate_batch。
+    物件本身也可以當 Route 的 lookup 用（index(xy) -> router_id）。
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.cell_router = np.full((width, height), NO_ROUTER, dtype=np.int32)
+        self.router_xy = np.full((0, 2), -1, dtype=np.int32)
+        self._nodes: List[Optional[Node]] = []
+
+    # ----- 建立 -----
+
+    @classmethod
+    def from_placed(
+        cls,
+        placed: Dict[int, Node],
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ) -> "RouterIndex":
+        """用 placed 建；沒給 width / height 就用座標的最大值"""
+        nodes = [n for n in placed.values() if n.router_id is not None and n.router_id >= 0]
+        if width is None:
+            width = max((n.x for n in nodes), default=-1) + 1
+        if height is None:
+            height = max((n.y for n in nodes), default=-1) + 1
+        index = cls(width, height)
+        index._fill(nodes)
+        return index
+
+    @classmethod
+    def from_grid(cls, grid, placed: Optional[Dict[int, Node]] = None) -> "RouterIndex":
+        """
+        用 Grid 建（格子存的是 router_id，solve / solve_template / PlacementCache 都是這樣放的）。
+        座標一律照 grid 的內容；有給 placed 的話再照 router_id 掛上 Node，node_of 才查得到。
+        """
+        index = cls(grid.width, grid.height)
+        xs, ys, rids = [], [], []
+        for x in range(grid.width):
+            for y in range(grid.height):
+                r = grid.get(x, y)
+                if r is not None and r >= 0:
+                    xs.append(x)
+                    ys.append(y)
+                    rids.append(r)
+        index._fill_arrays(np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64), np.array(rids, dtype=np.int64))
+        if placed is not None:
+            for n in placed.values():
+                if n.router_id is not None and 0 <= n.router_id < len(index._nodes):
+                    index._nodes[n.router_id] = n
+        return index
+
+    def _fill(self, nodes: Sequence[Node]):
+        xs = np.fromiter((n.x for n in nodes), dtype=np.int64, count=len(nodes))
+        ys = np.fromiter((n.y for n in nodes), dtype=np.int64, count=len(nodes))
+        rids = np.fromiter((n.router_id for n in nodes), dtype=np.int64, count=len(nodes))
+        self._fill_arrays(xs, ys, rids)
+        for n in nodes:
+            self._nodes[n.router_id] = n
+
+    def _fill_arrays(self, xs: np.ndarray, ys: np.ndarray, rids: np.ndarray):
+        if len(rids) and (xs.min() < 0 or ys.min() < 0 or xs.max() >= self.width or ys.max() >= self.height):
+            raise ValueError(f"有 router 超出範圍 0..{self.width-1}, 0..{self.height-1}")
+        if len(np.unique(rids)) != len(rids):
+            raise ValueError("同一個 router_id 出現在兩個格子")
+        size = int(rids.max()) + 1 if len(rids) else 0
+        self.router_xy = np.full((size, 2), -1, dtype=np.int32)
+        self.router_xy[rids, 0] = xs
+        self.router_xy[rids, 1] = ys
+        self.cell_router[xs, ys] = rids
+        self._nodes = [None] * size
+
+    def move(self, router_id: int, xy: XY):
+        """router 換位置（例如 repair_placement 之後）；新格子原本的 router 會被蓋掉"""
+        ox, oy = self.router_xy[router_id]
+        if ox >= 0 and self.cell_router[ox, oy] == router_id:
+            self.cell_router[ox, oy] = NO_ROUTER
+        x, y = xy
+        self.cell_router[x, y] = router_id
+        self.router_xy[router_id] = (x, y)
+
+    # ----- 單點查詢 -----
+
+    def router_at(self, x: int, y: int, missing: str = "raise") -> int:
+        """(x, y) 上的 router_id；沒有的話照 missing 處理（"skip" 跟 "keep" 都回 NO_ROUTER）"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            r = int(self.cell_router[x, y])
+            if r != NO_ROUTER:
+                return r
+        if missing == "raise":
+            raise ValueError(f"座標 {(x, y)} 找不到對應的 router")
+        return NO_ROUTER
+
+    def __call__(self, xy: XY) -> int:
+        return self.router_at(xy[0], xy[1])
+
+    def node_of(self, router_id: int) -> Optional[Node]:
+        """router_id -> Node，沒有就 None"""
+        if 0 <= router_id < len(self._nodes):
+            return self._nodes[router_id]
+        return None
+
+    def xy_of(self, router_id: int) -> Optional[XY]:
+        if 0 <= router_id < len(self.router_xy):
+            x, y = self.router_xy[router_id]
+            if x >= 0:
+                return int(x), int(y)
+        return None
+
+    # ----- 整條路徑 -----
+
+    def _lookup(self, coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """coords (N, 2) -> (router_id, ok)，超出範圍也當作沒有 router"""
+        coords = np.asarray(coords)
+        if coords.size == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=bool)
+        xs, ys = coords[:, 0], coords[:, 1]
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        rids = np.full(len(coords), NO_ROUTER, dtype=np.int32)
+        rids[inside] = self.cell_router[xs[inside], ys[inside]]
+        return rids, rids != NO_ROUTER
+
+    def _raise_missing(self, coords: np.ndarray, ok: np.ndarray):
+        x, y = coords[np.flatnonzero(~ok)[0]]
+        raise ValueError(f"座標 {(int(x), int(y))} 找不到對應的 router")
+
+    def translate_array(self, coords, missing: str = "raise") -> np.ndarray:
+        """座標陣列 (N, 2) -> router_id 陣列"""
+        if missing not in MISSING_POLICIES:
+            raise ValueError(f"missing 必須是 {MISSING_POLICIES} 其中之一")
+        coords = np.asarray(coords).reshape(-1, 2)
+        rids, ok = self._lookup(coords)
+        if ok.all() or missing == "keep":
+            return rids
+        if missing == "raise":
+            self._raise_missing(coords, ok)
+        return rids[ok]
+
+    def translate(self, path: Iterable[XY], missing: str = "raise") -> List[int]:
+        """座標路徑 [(x, y), ...] -> [router_id, ...]"""
+        return self.translate_array(np.array(list(path), dtype=np.int64), missing).tolist()
+
+    def translate_batch(
+        self,
+        offsets: np.ndarray,
+        coords: np.ndarray,
+        missing: str = "raise",
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CSR 格式的多條路徑（route_batch 的輸出）一次轉換：
+        第 i 條是 coords[offsets[i]:offsets[i+1]]，回傳同樣格式的 (offsets, router_id)。
+        missing="skip" 時 offsets 會跟著縮。
+        """
+        if missing not in MISSING_POLICIES:
+            raise ValueError(f"missing 必須是 {MISSING_POLICIES} 其中之一")
+        offsets = np.asarray(offsets)
+        coords = np.asarray(coords).reshape(-1, 2)
+        rids, ok = self._lookup(coords)
+        if ok.all() or missing == "keep":
+            return offsets, rids
+        if missing == "raise":
+            self._raise_missing(coords, ok)
+        kept = np.zeros(len(coords) + 1, dtype=np.int64)
+        np.cumsum(ok, out=kept[1:])
+        return kept[offsets].astype(offsets.dtype), rids[ok]
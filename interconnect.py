@@ -1,17 +1,21 @@
 """
 找到所有配對的路徑(XY, YX)
 """
-import math
 from collections import defaultdict
 from typing import List, Tuple, Dict, DefaultDict, Set, Optional
 
-from algorithms import solve
+from algorithms import placement_cache
 from algorithms import node_layer
-from algorithms import xy_route_by_coord
-from algorithms import yx_route_by_coord
-from algorithms import assign_router
+from algorithms import assign_router_arrays
+from algorithms import write_core_ids
+from algorithms import stream_links_to_network
+from algorithms.link_pipeline import iter_pairs
+from algorithms.link_pipeline import route_pairs
+from algorithms.topology_cache import topology_cache
 from data_structure import Node
 from data_structure import Network
+from data_structure import Route
+from data_structure import RouterIndex
 from visualize import visualize_network
 
 def parent_child_pairs_by_level(num_nodes: int):
@@ -19,79 +23,78 @@ def parent_child_pairs_by_level(num_nodes: int):
     回傳格式：
     level 1 2: (1,2) (1,3)
     level 2 3: (2,4) (2,5) (3,6) (3,7)
-    """
-    levels = defaultdict(list)
-
-    for parent in range(1, num_nodes + 1):
-        parent_level = int(math.floor(math.log2(parent))) + 1
 
-        left = 2 * parent
-        right = 2 * parent + 1
-
-        if left <= num_nodes:
-            levels[parent_level].append((parent, left))
-        if right <= num_nodes:
-            levels[parent_level].append((parent, right))
+    配對直接從共用的 TreeIndex 拿（同一個 num_nodes 只算一次）
+    """
+    return topology_cache.tree_index(num_nodes).pair_lists_by_level()
 
-    return levels
+def coord_to_router_id(xy: Tuple[int, int], placed: Dict[int, Node], index: Optional[RouterIndex] = None) -> int:
+    """座標 -> router_id；有給 index 就 O(1)，沒給會先建一個（只查一次的時候才這樣用）"""
+    if index is None:
+        index = RouterIndex.from_placed(placed)
+    return index.router_at(*xy)
 
-def coord_to_router_id(xy: Tuple[int, int], placed: Dict[int, Node]) -> int:
-    x, y = xy
-    for n in placed.values():  # placed 是 dict -> values() 才是 Node
-        if n.x == x and n.y == y:
-            return n.router_id
-    raise ValueError(f"座標 {xy} 找不到對應的 router")
+def find_node_by_router_id(placed, target_router_id, index: Optional[RouterIndex] = None):
+    if index is None:
+        index = RouterIndex.from_placed(placed)
+    return index.node_of(target_router_id)
 
-def find_node_by_router_id(placed, target_router_id):
-    for node in placed.values():
-        if node.router_id == target_router_id:
-            return node
-    return None
+def router_lookup(placed: Dict[int, Node]) -> RouterIndex:
+    """座標 -> router_id 的查詢（RouterIndex，建一次表之後 O(1)；找不到跟 coord_to_router_id 一樣 raise）"""
+    return RouterIndex.from_placed(placed)
 
 def build_routes_dict_by_level(
     num_nodes: int,
     placed: Dict[int, Node],
-) -> Dict[int, Dict[Tuple[int, int], dict]]:
+) -> Dict[int, Dict[Tuple[int, int], Route]]:
     """
     回傳格式：
-    routes[level][(p,c)] = {
-        "parent": p,
-        "child": c,
-        "src_router": placed[p].router_id,
-        "dst_router": placed[c].router_id,
-        "XY": [router_id...],
-        "YX": [router_id...],
-    }
+    routes[level][(p,c)] = Route(...)
+    Route 只存端點，hop 要用的時候才展開；舊的寫法照樣可以用：
+        route["parent"] / route["child"] / route["src_router"] / route["dst_router"]
+        route["XY"] / route["YX"]  -> [router_id...]
     """
     pair_list = parent_child_pairs_by_level(num_nodes)
+    lookup = router_lookup(placed)
 
     routes = defaultdict(dict)
 
     for level in sorted(pair_list.keys()):
         for p, c in pair_list[level]:
-            # 直接用 placed 取 node（不需要 find_node_by_router_id）
-            p_node = placed[p]
-            c_node = placed[c]
-
-            src_xy = (p_node.x, p_node.y)
-            dst_xy = (c_node.x, c_node.y)
+            routes[level][(p, c)] = build_route_entry(p, c, placed, lookup)
 
-            path_xy = xy_route_by_coord(src_xy, dst_xy)
-            path_yx = yx_route_by_coord(src_xy, dst_xy)
-
-            xy_router_path = [coord_to_router_id(xy, placed) for xy in path_xy]
-            yx_router_path = [coord_to_router_id(xy, placed) for xy in path_yx]
+    return routes
 
-            routes[level][(p, c)] = {
-                "parent": p,
-                "child": c,
-                "src_router": p_node.router_id,
-                "dst_router": c_node.router_id,
-                "XY": xy_router_path,
-                "YX": yx_router_path,
-            }
+def build_route_entry(p: int, c: int, placed: Dict[int, Node], lookup=None) -> Route:
+    """單一 (p, c) 的 routes[level][(p, c)] 內容"""
+    # 直接用 placed 取 node（不需要 find_node_by_router_id）
+    p_node = placed[p]
+    c_node = placed[c]
+    if lookup is None:
+        lookup = router_lookup(placed)
+
+    return Route(
+        parent=p,
+        child=c,
+        src_router=p_node.router_id,
+        dst_router=c_node.router_id,
+        src=(p_node.x, p_node.y),
+        dst=(c_node.x, c_node.y),
+        lookup=lookup,
+    )
 
-    return routes
+def refresh_routes(
+    routes: Dict[int, Dict[Tuple[int, int], dict]],
+    placed: Dict[int, Node],
+    pairs,
+) -> None:
+    """
+    placement 局部修補（repair_placement）之後，只重算受影響的 (p, c)，
+    其他 routes 原封不動。
+    """
+    lookup = router_lookup(placed)
+    for p, c in pairs:
+        routes[node_layer(p)][(p, c)] = build_route_entry(p, c, placed, lookup)
 
 def build_router_id_map(placed: Dict[int, "Node"]) -> Dict[int, "Node"]:
     """router_id -> Node（同一個 router_id 應該只對到一個 Node）"""
@@ -103,6 +106,25 @@ def build_router_id_map(placed: Dict[int, "Node"]) -> Dict[int, "Node"]:
     return m
 
 
+def network_node_resolver(network: Network, placed: Dict[int, Node]):
+    """
+    router_id -> Node：先查 network 自己的索引，
+    network 裡沒有的才回頭從 placed 建一次 RouterIndex（只建一次）
+    """
+    index: Optional[RouterIndex] = None
+
+    def resolve(router_id: int) -> Optional[Node]:
+        nonlocal index
+        node = network.node(router_id)
+        if node is None:
+            if index is None:
+                index = RouterIndex.from_placed(placed)
+            node = index.node_of(router_id)
+        return node
+
+    return resolve
+
+
 def add_last_level_routes_to_network(
     network: Network,
     routes: Dict[int, Dict[Tuple[int, int], dict]],
@@ -115,9 +137,10 @@ def add_last_level_routes_to_network(
         return
 
     last_level = max(routes.keys())
-    rid_to_node = build_router_id_map(placed)
+    resolve = network_node_resolver(network, placed)
 
-    added = set()  # 去重用
+    # 只在這一次呼叫裡去重；network 裡本來就有的邊（例如前面層的）照樣再加一條灰色的
+    added = set()
 
     for (p, c), info in routes[last_level].items():
         router_path = info.get(use, [])
@@ -125,8 +148,8 @@ def add_last_level_routes_to_network(
             continue
 
         for a, b in zip(router_path[:-1], router_path[1:]):
-            u = rid_to_node.get(a)
-            v = rid_to_node.get(b)
+            u = resolve(a)
+            v = resolve(b)
             if u is None or v is None:
                 continue
 
@@ -135,7 +158,7 @@ def add_last_level_routes_to_network(
                 continue
 
             # ★ 重點：最後一層一律灰色
-            network.add_link(u, v, bandwidth, color="gray")
+            network.add_link(u, v, bandwidth, color="gray", dedup=None)
 
             added.add(key)
 
@@ -153,6 +176,8 @@ def add_unique_route_links_for_level(
       - 若 XY == YX，視為唯一路徑
       - 將 router path 拆成相鄰邊並加入 Network
 
+    seen_undirected 沒傳的話，直接用 net 的邊表去重（net 裡已經有的邊不會再加）
+
     回傳：
       [(u_router, v_router), ...]  此 level 新增的邊
     """
@@ -161,66 +186,58 @@ def add_unique_route_links_for_level(
         return []
 
     # router_id -> Node
-    router_to_node: Dict[int, "Node"] = {}
-    for n in placed.values():
-        if getattr(n, "router_id", -1) is not None and n.router_id >= 0:
-            router_to_node[n.router_id] = n
-
-    # 若 main 沒傳，就在這層自己用（通常建議 main 傳進來）
-    if seen_undirected is None:
-        seen_undirected = set()
+    resolve = network_node_resolver(net, placed)
 
     added_edges: List[Tuple[int, int]] = []
 
     for (p, c), info in routes[level].items():
-        path_xy = info.get("XY", [])
-        path_yx = info.get("YX", [])
-
-        # 唯一路徑判斷
-        if path_xy != path_yx:
-            continue
-
-        path = path_xy
+        # 唯一路徑判斷：Route 直接看起終點是不是同一列 / 同一行（O(1)），舊的 dict 才比整條
+        if isinstance(info, Route):
+            if not info.is_unique or info.length < 2:
+                continue
+            path = info["XY"]
+        else:
+            path_xy = info.get("XY", [])
+            path_yx = info.get("YX", [])
+            if path_xy != path_yx:
+                continue
+            path = path_xy
         if len(path) < 2:
             continue
 
         for u, v in zip(path[:-1], path[1:]):
-            node_u = router_to_node.get(u)
-            node_v = router_to_node.get(v)
+            node_u = resolve(u)
+            node_v = resolve(v)
             if node_u is None or node_v is None:
                 continue
 
-            key = (u, v) if u < v else (v, u)
-            if key in seen_undirected:
+            if seen_undirected is not None:
+                key = (u, v) if u < v else (v, u)
+                if key in seen_undirected:
+                    continue
+                seen_undirected.add(key)
+            elif net.has_link(u, v):
                 continue
-            seen_undirected.add(key)
 
-            net.add_link(node_u, node_v, bandwidth)
+            net.add_link(node_u, node_v, bandwidth, dedup=None)
             added_edges.append((u, v))
 
     return added_edges
 
 def main():
     num = 16
-    placed, grid = solve(num)
-
-    # router-core 配對
-    router_map = assign_router(num)
-    router_to_core = {rid: core for rid, core in router_map.items()}
+    placed, grid = placement_cache.get_or_solve(num)
 
-    # 寫回 placed
-    for rid, core in router_to_core.items():
-        if rid in placed:
-            placed[rid].core_id = core
+    # router-core 配對，寫回 placed
+    router_to_core, _ = assign_router_arrays(num)
+    write_core_ids(placed, router_to_core)
 
-    # build routes（寫回後再建）
-    routes = build_routes_dict_by_level(num - 1, placed)
+    # 座標 <-> router 索引（寫回後再建）；routes 不再整包建，要用的時候才串流產生
+    index = RouterIndex.from_placed(placed)
 
-    # 建 network
-    k = int(math.log2(num))
-    W = 2 ** ((k + 1) // 2)
-    H = 2 ** (k // 2)
-    network = Network(W, H)
+    # 建 network（重複的邊由 network 自己的邊表擋掉，跨 level 也一樣）
+    W, H = topology_cache.grid_shape(num)
+    network = Network(W, H, dedup="undirected")
 
     for node in placed.values():
         network.add_existing_node(node) 
@@ -240,9 +257,6 @@ def main():
 
     # 加入唯一路徑
 
-    # 全域去重集合（跨 level）
-    seen_undirected = set()
-
     unique_edges_by_level = {}
 
     """
@@ -253,18 +267,20 @@ def main():
             routes=routes,
             placed=placed,
             bandwidth=2,
-            seen_undirected=seen_undirected,
         )
         unique_edges_by_level[level] = edges
     """
     test_level = 2
-    edges = add_unique_route_links_for_level(
-        net=network,
-        level=test_level,
-        routes=routes,
-        placed=placed,
+    edges = []
+    stream_links_to_network(
+        network,
+        placed,
+        num - 1,
+        index=index,
+        levels=[test_level],
         bandwidth=2,
-        seen_undirected=seen_undirected,
+        dedup="none",
+        added=edges,
     )
     
 
@@ -279,10 +295,12 @@ def main():
     print("\n\n")
     print("=== Router Path Result (1 ~ n layers, leaf included) ===")
 
-    for level in sorted(routes.keys()):
-        print(f"\nlevel {level} -> {level+1}")
-        for (p, c), rec in routes[level].items():
-            print(f"({p},{c})  XY={rec['XY']}  YX={rec['YX']}")
+    level = None
+    for rec in route_pairs(iter_pairs(num - 1), placed, index):
+        if node_layer(rec.parent) != level:
+            level = node_layer(rec.parent)
+            print(f"\nlevel {level} -> {level+1}")
+        print(f"({rec.parent},{rec.child})  XY={rec['XY']}  YX={rec['YX']}")
 
 
     visualize_network(network)
@@ -1,13 +1,15 @@
-from algorithms import solve
+from algorithms import placement_cache
 from algorithms import node_layer
-from algorithms import assign_router
+from algorithms import assign_router_arrays
+from algorithms import write_core_ids
 from visualize import visualize_grid
 
 
 def main():
     num = 32
 
-    placed, grid = solve(num)
+    # 同一個 num 解過就直接從磁碟快取讀
+    placed, grid = placement_cache.get_or_solve(num)
 
     #placed 資料結構
     print("=== Placement Result (1 ~ n layers, leaf included) ===")
@@ -34,18 +36,11 @@ def main():
     for nid, n in placed.items():
         print(n)
 
-    #建立router core配對結果
-    router_map = assign_router(num)
-    core_to_router = {}
-    for rid, core in router_map.items():
-        core_to_router[core] = rid
-
-    router_to_core = {rid: core for rid, core in router_map.items()}
+    #建立router core配對結果（兩個方向都是陣列）
+    router_to_core, core_to_router = assign_router_arrays(num)
 
     #配對結果寫回placed中的Node
-    for rid, core in router_to_core.items():
-        if rid in placed:
-            placed[rid].core_id = core
+    write_core_ids(placed, router_to_core)
 
     print("DFS後存取配對結果")
     for nid, n in placed.items():
@@ -0,0 +1,94 @@
+"""
+測試 optimize_router_mapping 是精確最佳解：
+num = 4 / 8 / 16 時把樹限制下所有合法的 router <-> core 配對暴力列出來，
+最小成本要跟 optimize_router_mapping 回報的一樣，回傳的配對本身也要合法。
+"""
+
+import itertools
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from algorithms import solve
+from algorithms import assign_router_arrays
+from algorithms import optimize_router_mapping
+from algorithms.assign_router import mapping_cost
+
+
+def core_range(router_id: int, num_cores: int) -> range:
+    """第 L 層第 k 個 router 能配的 core 位址 [k*s, (k+1)*s)"""
+    m = 1 << (router_id.bit_length() - 1)
+    s = num_cores // m
+    k = router_id - m
+    return range(k * s, (k + 1) * s)
+
+
+def all_mappings(router_id: int, num_cores: int) -> List[Tuple[Dict[int, int], int]]:
+    """子樹 router_id 所有合法的配法：[(router -> core, 剩下往上交的 core), ...]"""
+    kids = [c for c in (2 * router_id, 2 * router_id + 1) if c < num_cores]
+    if not kids:
+        a, b = core_range(router_id, num_cores)
+        return [({router_id: a}, b), ({router_id: b}, a)]
+    out = []
+    left = all_mappings(2 * router_id, num_cores)
+    right = all_mappings(2 * router_id + 1, num_cores)
+    for (al, ul), (ar, ur) in itertools.product(left, right):
+        out.append(({**al, **ar, router_id: ul}, ur))
+        out.append(({**al, **ar, router_id: ur}, ul))
+    return out
+
+
+def brute_force_cost(placed, num_cores: int, weights, target, leftover: Optional[int]) -> float:
+    best = None
+    for mapping, rest in all_mappings(1, num_cores):
+        if leftover is not None and rest != leftover:
+            continue
+        r2c = np.full(num_cores, -1, dtype=np.int64)
+        for r, c in mapping.items():
+            r2c[r] = c
+        cost = mapping_cost(placed, r2c, weights, target)
+        if best is None or cost < best:
+            best = cost
+    return best
+
+
+def check_mapping(router_to_core: np.ndarray, core_to_router: np.ndarray, num_cores: int):
+    """每個 router 配自己範圍裡的 core，core 不重複，兩個方向對得起來"""
+    cores = router_to_core[1:].tolist()
+    if len(set(cores)) != num_cores - 1:
+        raise RuntimeError("有 core 被配了兩次")
+    for r in range(1, num_cores):
+        if cores[r - 1] not in core_range(r, num_cores):
+            raise RuntimeError(f"router {r} 配到範圍外的 core {cores[r - 1]}")
+        if core_to_router[cores[r - 1]] != r:
+            raise RuntimeError(f"core_to_router 跟 router_to_core 對不起來（router {r}）")
+
+
+def main():
+    random.seed(0)
+    for num in (4, 8, 16):
+        placed, _ = solve(num)
+        W = max(n.x for n in placed.values()) + 1
+        H = max(n.y for n in placed.values()) + 1
+        default_r2c, _ = assign_router_arrays(num)
+        for trial in range(4):
+            weights = np.array([random.random() for _ in range(num)])
+            target = None if trial % 2 else [(random.randrange(W), random.randrange(H)) for _ in range(num)]
+            for leftover in (-1, None):
+                r2c, c2r, report = optimize_router_mapping(placed, weights, target, leftover=leftover)
+                check_mapping(r2c, c2r, num)
+                best = brute_force_cost(placed, num, weights, target, num - 1 if leftover == -1 else None)
+                if abs(report["optimized_cost"] - best) > 1e-9:
+                    raise RuntimeError(
+                        f"num={num} trial={trial} leftover={leftover}："
+                        f"optimize_router_mapping 的成本 {report['optimized_cost']} != 暴力最佳 {best}"
+                    )
+                if leftover == -1 and mapping_cost(placed, default_r2c, weights, target) < best - 1e-9:
+                    raise RuntimeError("預設配對比最佳解還好，暴力列舉漏掉了東西")
+        print(f"num={num}: optimize_router_mapping 跟暴力列舉的最佳成本一致")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+測試 solve_parallel 的中止旗標：
+  - 某個 worker 找到答案之後，其他還在 Part B（dfs_leaves）裡搜尋的 worker 要跟著停，
+    不能等它們把 leaf 的指數搜尋跑完
+  - deterministic 的結果跟 serial 的 solve 一樣
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from algorithms import solve
+from algorithms.parallel_placement import _init_worker, _solve_prefix, _stopped, enumerate_prefixes, solve_parallel
+from algorithms.placement import block_order, dfs_blocks, dfs_leaves, leaf_parents_of, prepare_search
+from data_structure import Grid
+
+# 這個 num 的 Part B 一旦注定失敗，沒有中止的話要回朔 2^31 次以上
+HOPELESS_NUM = 128
+STOP_LIMIT = 30.0  # 秒
+
+
+def hopeless_leaves(num: int) -> bool:
+    """
+    worker：Part A 正常放完，再把最後一個 leaf block 裡 leaf 要用的一格占掉，
+    Part B 就一定失敗、會一直回朔前面所有的 leaf，只能靠 stop 停下來
+    """
+    grid, blocks, dists, placed = prepare_search(num, Grid, prune=True)
+    if not dfs_blocks(grid, blocks, dists, placed, block_order(blocks), 0, num - 1, prune=True):
+        raise RuntimeError("Part A 失敗")
+    leaf_parents = leaf_parents_of(blocks)
+    last = leaf_parents[-1]
+    b, p = blocks[last], placed[last]
+    for x in range(b.x0, b.x1 + 1):
+        for y in range(b.y0, b.y1 + 1):
+            if not grid.is_used(x, y) and abs(x - p.x) + abs(y - p.y) == dists[-1]:
+                grid.place(x, y, -1)
+                return dfs_leaves(grid, blocks, dists, placed, leaf_parents, 0, stop=_stopped)
+    raise RuntimeError("最後一個 leaf block 找不到可以占的格子")
+
+
+def check_stop_in_leaves():
+    """一個 worker 贏了之後 set 旗標，卡在 Part B 的 worker 要在 STOP_LIMIT 內結束"""
+    ctx = multiprocessing.get_context()
+    event = ctx.Event()
+    pool = ProcessPoolExecutor(max_workers=2, mp_context=ctx, initializer=_init_worker, initargs=(event,))
+    try:
+        loser = pool.submit(hopeless_leaves, HOPELESS_NUM)
+        # 在本 process 先找一個放得完的 prefix，拿去當贏的那個 worker
+        prefixes = enumerate_prefixes(16)
+        i = next(i for i, pre in enumerate(prefixes) if _solve_prefix(16, Grid, False, pre, i)[2])
+        winner = pool.submit(_solve_prefix, 16, Grid, False, prefixes[i], i)
+        if not winner.result()[2]:
+            raise RuntimeError("num=16 的 winner 應該放得完")
+        time.sleep(1.0)  # 讓 loser 確實進到 Part B
+        if loser.done():
+            raise RuntimeError("Part B 應該還在搜尋")
+
+        t0 = time.perf_counter()
+        event.set()
+        try:
+            ok = loser.result(timeout=STOP_LIMIT)
+        except TimeoutError:
+            raise RuntimeError(f"set 中止旗標 {STOP_LIMIT} 秒後 dfs_leaves 還沒停")
+        if ok:
+            raise RuntimeError("被中止的 dfs_leaves 應該回 False")
+        print(f"Part B 在中止後 {time.perf_counter() - t0:.3f} 秒停下來")
+    finally:
+        event.set()
+        pool.shutdown(wait=True)
+
+
+def check_same_as_serial():
+    for num in (16, 32, 64):
+        a, _ = solve(num)
+        b, _ = solve_parallel(num, workers=2)
+        if {k: (n.x, n.y) for k, n in a.items()} != {k: (n.x, n.y) for k, n in b.items()}:
+            raise RuntimeError(f"num={num}：deterministic 的 solve_parallel 跟 solve 不一樣")
+    print("deterministic 結果跟 solve 一樣")
+
+
+def main():
+    check_stop_in_leaves()
+    check_same_as_serial()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
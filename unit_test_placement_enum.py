@@ -0,0 +1,87 @@
+"""
+測試 iter_placements：
+  - dedup=False 列出來的解，跟最直接的暴力回朔（每個節點在自己的 block 裡逐格試）一模一樣，
+    num = 4 / 8 / 16 分別是 8 / 48 / 704 個
+  - dedup=True 時每個鏡射軌道剛好留一個，而且是軌道裡 lexicographic 最小的那個
+"""
+
+from typing import Dict, List, Set, Tuple
+
+from algorithms import iter_placements
+from algorithms.placement_enum import mirror_permutation, mirror_placement
+from algorithms.template_placement import TemplateSolver
+from algorithms.topology_cache import topology_cache
+
+XY = Tuple[int, int]
+Placement = Tuple[XY, ...]  # node 1..num-1 的 (x, y)
+
+EXPECTED = {4: 8, 8: 48, 16: 704}
+
+
+def brute_force(num: int) -> Set[Placement]:
+    blocks = topology_cache.area_partition(num)
+    _, dists = topology_cache.inter_layer_distances(num)
+    num_nodes = num - 1
+    out: Set[Placement] = set()
+    pos: Dict[int, XY] = {}
+
+    def rec(nid: int):
+        if nid > num_nodes:
+            out.add(tuple(pos[i] for i in range(1, num)))
+            return
+        b = blocks.get(nid) or blocks[nid // 2]
+        for x in range(b.x0, b.x1 + 1):
+            for y in range(b.y0, b.y1 + 1):
+                if (x, y) in pos.values():
+                    continue
+                if nid > 1:
+                    px, py = pos[nid // 2]
+                    if abs(px - x) + abs(py - y) != dists[nid.bit_length() - 2]:
+                        continue
+                pos[nid] = (x, y)
+                rec(nid + 1)
+                del pos[nid]
+
+    rec(1)
+    return out
+
+
+def as_tuple(arr) -> Placement:
+    return tuple(tuple(xy) for xy in arr[1:].tolist())
+
+
+def main():
+    for num, expected in EXPECTED.items():
+        full: List = list(iter_placements(num, dedup=False))
+        full_set = {as_tuple(a) for a in full}
+        if len(full) != len(full_set):
+            raise RuntimeError(f"num={num}：dedup=False 有重複的解")
+        brute = brute_force(num)
+        if full_set != brute or len(brute) != expected:
+            raise RuntimeError(f"num={num}：列舉 {len(full_set)} 個、暴力 {len(brute)} 個，應該都是 {expected}")
+
+        # 鏡射軌道：鏡射後還要是合法解，每個軌道的代表是最小的那個
+        solver = TemplateSolver(num)
+        flips = [(0, 1), (1, 0), (1, 1)]
+        perms = {f: mirror_permutation(solver, f) for f in flips}
+        canonical = set()
+        for a in full:
+            orbit = {as_tuple(a)}
+            for f in flips:
+                m = as_tuple(mirror_placement(a, perms[f], f, solver.width, solver.height))
+                if m not in full_set:
+                    raise RuntimeError(f"num={num}：鏡射 {f} 之後不是合法解")
+                orbit.add(m)
+            canonical.add(min(orbit))
+
+        dedup = [as_tuple(a) for a in iter_placements(num)]
+        if len(dedup) != len(set(dedup)) or set(dedup) != canonical:
+            raise RuntimeError(
+                f"num={num}：dedup=True 給了 {len(dedup)} 個，應該是 {len(canonical)} 個軌道各一個最小的"
+            )
+        print(f"num={num}: {len(full_set)} 個解（跟暴力一樣），{len(canonical)} 個鏡射軌道")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
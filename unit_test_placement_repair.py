@@ -0,0 +1,111 @@
+"""
+測試 repair_placement：把每一個有節點的格子輪流 blocked 掉，修補後檢查
+  - placement 還是合法的（每個節點在自己的 block 裡、父子距離 = level_dist、不重疊）
+  - blocked 的格子是空的
+  - 回傳的 moved 剛好是位置有變的那些節點
+  - 回傳的 pairs 剛好是 XY / YX 路徑（經過的 router）有變的那些 parent-child
+  - refresh_routes 只重算 pairs 之後，跟整包重建的 routes 一樣
+  - grid 跟 placed 一致
+"""
+
+from typing import Dict, Tuple
+
+from algorithms import solve_template
+from algorithms import repair_placement
+from algorithms.topology_cache import topology_cache
+from data_structure import Node
+from interconnect import build_routes_dict_by_level, refresh_routes
+
+
+def check_placement(num: int, placed: Dict[int, Node]):
+    """placement 合法就安靜結束，不合法 raise RuntimeError"""
+    blocks = topology_cache.area_partition(num)
+    _, dists = topology_cache.inter_layer_distances(num)
+
+    if set(placed) != set(range(1, num)):
+        raise RuntimeError("placed 的 node_id 不是 1..num-1")
+    cells = {(n.x, n.y) for n in placed.values()}
+    if len(cells) != num - 1:
+        raise RuntimeError("有兩個節點放在同一格")
+
+    for nid, n in placed.items():
+        b = blocks.get(nid) or blocks[nid // 2]  # leaf 用 parent 的 block
+        if not (b.x0 <= n.x <= b.x1 and b.y0 <= n.y <= b.y1):
+            raise RuntimeError(f"node{nid} 在 ({n.x},{n.y})，不在自己的 block 裡")
+        if nid > 1:
+            p = placed[nid // 2]
+            d = abs(p.x - n.x) + abs(p.y - n.y)
+            if d != dists[nid.bit_length() - 2]:
+                raise RuntimeError(f"node{nid} 跟 parent 的距離是 {d}，應該是 {dists[nid.bit_length() - 2]}")
+
+
+def route_signature(route, occupant: Dict[Tuple[int, int], int]) -> tuple:
+    """
+    Route 的端點 + XY / YX 每一格上的 router（空格是 None）；
+    路徑會經過空格 / blocked 的格子，所以不用 route["XY"]（找不到 router 會 raise）
+    """
+    return (
+        route.src_router,
+        route.dst_router,
+        route.src,
+        route.dst,
+        tuple(occupant.get(xy) for xy in route.hops("XY")),
+        tuple(occupant.get(xy) for xy in route.hops("YX")),
+    )
+
+
+def route_signatures(placed: Dict[int, Node], routes) -> Dict[Tuple[int, int], tuple]:
+    occupant = {(n.x, n.y): n.router_id for n in placed.values()}
+    return {pc: route_signature(r, occupant) for level in routes.values() for pc, r in level.items()}
+
+
+def check_single_block(num: int, blocked_xy: Tuple[int, int]) -> int:
+    """blocked 一格之後修補並檢查，回傳搬了幾個節點"""
+    placed, grid = solve_template(num)
+    before = {nid: (n.x, n.y) for nid, n in placed.items()}
+    routes = build_routes_dict_by_level(num - 1, placed)
+    sig_before = route_signatures(placed, routes)
+
+    moved, pairs = repair_placement(num, placed, [blocked_xy], grid=grid)
+
+    check_placement(num, placed)
+    after = {nid: (n.x, n.y) for nid, n in placed.items()}
+    if blocked_xy in after.values():
+        raise RuntimeError(f"blocked 的格子 {blocked_xy} 還有節點")
+    if sorted(moved) != sorted(nid for nid in before if before[nid] != after[nid]):
+        raise RuntimeError(f"blocked={blocked_xy}：moved 跟實際搬動的節點不一樣")
+    if grid.is_used(*blocked_xy):
+        raise RuntimeError(f"blocked 的格子 {blocked_xy} 在 grid 上還是占用的")
+    for nid, n in placed.items():
+        if grid.get(n.x, n.y) != n.router_id:
+            raise RuntimeError(f"grid ({n.x},{n.y}) 跟 node{nid} 的 router_id 對不起來")
+    for p, c in pairs:
+        if c // 2 != p:
+            raise RuntimeError(f"回傳的配對 ({p},{c}) 不是 parent-child")
+
+    rebuilt = build_routes_dict_by_level(num - 1, placed)
+    sig_after = route_signatures(placed, rebuilt)
+    changed = {pc for pc in sig_after if sig_after[pc] != sig_before[pc]}
+    if changed != set(pairs):
+        raise RuntimeError(
+            f"blocked={blocked_xy}：路徑有變的配對 {sorted(changed)} 跟回傳的 pairs {sorted(pairs)} 不一樣"
+        )
+    refresh_routes(routes, placed, pairs)
+    if route_signatures(placed, routes) != sig_after:
+        raise RuntimeError(f"blocked={blocked_xy}：refresh_routes 之後跟整包重建的 routes 不一樣")
+    return len(moved)
+
+
+def main():
+    for num in (16, 64, 256):
+        placed, _ = solve_template(num)
+        cells = sorted((n.x, n.y) for n in placed.values())
+        total_moved = 0
+        for xy in cells:
+            total_moved += check_single_block(num, xy)
+        print(f"num={num}: {len(cells)} 個格子輪流 blocked 都修補成功，平均搬 {total_moved / len(cells):.1f} 個節點")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()